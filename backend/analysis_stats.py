@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-user analysis statistics, maintained incrementally
+
+Every flush that inserts AnalysisResult rows also updates the owner's
+AnalysisStats row on the same connection, so the summary commits or rolls
+back with the results. /api/analysis/stats and /api/profile/statistics read
+that single row instead of aggregating the user's history.
+
+Usage: python analysis_stats.py [user_id ...]   rebuild from AnalysisResult
+"""
+
+import logging
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, insert, update
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from db import db
+from flush_hooks import after_insert
+from models import AnalysisResult, AnalysisStats
+
+logger = logging.getLogger(__name__)
+
+RECENT_ANALYSES = 5
+
+
+def _recent_entry(analysis):
+    return {
+        'id': analysis.id,
+        'severity': analysis.severity,
+        'score': analysis.score,
+        'created_at': analysis.created_at.isoformat()
+    }
+
+
+def _merge_recent(recent, analyses):
+    """Fold new analyses into the newest-first ring, keeping RECENT_ANALYSES entries"""
+    merged = list(recent or []) + [_recent_entry(a) for a in analyses]
+    merged.sort(key=lambda entry: (entry['created_at'], entry['id']), reverse=True)
+    return merged[:RECENT_ANALYSES]
+
+
+def _summarize(analyses, stats=None):
+    """New column values for a stats row after adding ``analyses``"""
+    stats = stats or {}
+    severity_counts = dict(stats.get('severity_counts') or {})
+    scores = [a.score for a in analyses if a.score is not None]
+    for analysis in analyses:
+        key = analysis.severity or 'unknown'
+        severity_counts[key] = severity_counts.get(key, 0) + 1
+    return {
+        'total_analyses': (stats.get('total_analyses') or 0) + len(analyses),
+        'score_sum': (stats.get('score_sum') or 0) + sum(scores),
+        'score_count': (stats.get('score_count') or 0) + len(scores),
+        'severity_counts': severity_counts,
+        'recent_analyses': _merge_recent(stats.get('recent_analyses'), analyses),
+        'updated_at': datetime.utcnow()
+    }
+
+
+@after_insert(AnalysisResult)
+def _update_stats_on_insert(connection, results):
+    inserted = {}
+    for analysis in results:
+        inserted.setdefault(int(analysis.user_id), []).append(analysis)
+
+    table = AnalysisStats.__table__
+    for user_id, analyses in inserted.items():
+        row = connection.execute(
+            select(table).where(table.c.user_id == user_id).with_for_update()
+        ).mappings().first()
+        values = _summarize(analyses, row)
+        if row is None:
+            connection.execute(insert(table).values(user_id=user_id, **values))
+        else:
+            connection.execute(update(table).where(table.c.user_id == user_id).values(**values))
+
+
+def get_user_stats(user_id):
+    """Single-row lookup of a user's summary; None if they have no analyses yet"""
+    return db.session.get(AnalysisStats, int(user_id))
+
+
+def average_score(stats):
+    return stats.score_sum / stats.score_count if stats and stats.score_count else 0
+
+
+def rebuild_stats(user_ids=None):
+    """Recompute summaries from AnalysisResult, for backfill or repair. Returns users rebuilt."""
+    if not user_ids:
+        user_ids = [user_id for (user_id,) in db.session.query(AnalysisResult.user_id)
+                    .filter(AnalysisResult.user_id.isnot(None)).distinct()]
+
+    for user_id in user_ids:
+        user_id = int(user_id)
+        total, score_sum, score_count = db.session.query(
+            db.func.count(AnalysisResult.id),
+            db.func.coalesce(db.func.sum(AnalysisResult.score), 0),
+            db.func.count(AnalysisResult.score)
+        ).filter(AnalysisResult.user_id == user_id).one()
+        severity_counts = {
+            severity or 'unknown': count for severity, count in db.session.query(
+                AnalysisResult.severity, db.func.count(AnalysisResult.id)
+            ).filter(AnalysisResult.user_id == user_id).group_by(AnalysisResult.severity)
+        }
+        recent = AnalysisResult.query.filter_by(user_id=user_id)\
+            .order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())\
+            .limit(RECENT_ANALYSES).all()
+
+        stats = db.session.get(AnalysisStats, user_id) or AnalysisStats(user_id=user_id)
+        stats.total_analyses = total
+        stats.score_sum = int(score_sum)
+        stats.score_count = score_count
+        stats.severity_counts = severity_counts
+        stats.recent_analyses = [_recent_entry(a) for a in recent]
+        db.session.add(stats)
+
+    db.session.commit()
+    return len(user_ids)
+
+
+def main():
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Rebuilding analysis statistics...")
+        rebuilt = rebuild_stats([int(arg) for arg in sys.argv[1:]])
+        print(f"✅ Rebuilt statistics for {rebuilt} users")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Per-user cache of computed analytics responses
+
+Entries are keyed by user, endpoint and request parameters, and stamped with
+the user's analytics version. Committing a transaction that writes Progress
+or AnalysisResult rows bumps the owner's version, so every cached response
+computed from the old data stops matching at once; nothing has to be found
+and deleted. Entries also expire after ANALYTICS_CACHE_TTL_SECONDS, since
+windows such as "the last 30 days" and streaks move with the clock.
+
+Two backends: ``memory`` (per process) and ``local`` (files under
+ANALYTICS_CACHE_PATH, shared by every worker process on the host).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import Config
+from models import Progress, AnalysisResult
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'analytics_cache_users'
+
+
+def _entry_key(endpoint, params):
+    return endpoint + '?' + json.dumps(params or {}, sort_keys=True)
+
+
+class AnalyticsCache(ABC):
+    """Interface shared by the cache backends"""
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def version(self, user_id):
+        ...
+
+    @abstractmethod
+    def bump(self, user_id):
+        """Invalidate everything cached for a user"""
+
+    @abstractmethod
+    def get(self, user_id, key, version):
+        ...
+
+    @abstractmethod
+    def put(self, user_id, key, version, body):
+        ...
+
+    def stats(self):
+        return {'backend': type(self).__name__, 'hits': self.hits, 'misses': self.misses}
+
+
+class InProcessAnalyticsCache(AnalyticsCache):
+    """LRU of serialized responses in this process, bounded by entry count"""
+
+    def __init__(self, ttl_seconds=300, max_entries=10000):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._versions = {}
+        self._entries = OrderedDict()  # (user_id, key) -> (version, expires_at, body)
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions.get(str(user_id), 0)
+
+    def bump(self, user_id):
+        with self._lock:
+            user_id = str(user_id)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, user_id, key, version):
+        with self._lock:
+            entry = self._entries.get((str(user_id), key))
+            if entry is None or entry[0] != version or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end((str(user_id), key))
+            self.hits += 1
+            return entry[2]
+
+    def put(self, user_id, key, version, body):
+        with self._lock:
+            self._entries[(str(user_id), key)] = (version, time.monotonic() + self.ttl_seconds, body)
+            self._entries.move_to_end((str(user_id), key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {**super().stats(), 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class LocalAnalyticsCache(AnalyticsCache):
+    """
+    Files under ``root``: one version counter per user and one file per
+    cached response. Writes go through a temporary file and os.replace, so
+    readers in other processes never see a partial entry.
+    """
+
+    def __init__(self, root, ttl_seconds=300):
+        super().__init__(ttl_seconds)
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _version_path(self, user_id):
+        return os.path.join(self.root, f'{user_id}.version')
+
+    def _entry_path(self, user_id, key):
+        return os.path.join(self.root, f'{user_id}-{hashlib.sha256(key.encode()).hexdigest()[:32]}.json')
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def version(self, user_id):
+        try:
+            with open(self._version_path(user_id)) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, user_id):
+        import fcntl
+
+        # The counter file is locked so concurrent bumps from other processes never collapse into one
+        with self._lock, open(self._version_path(user_id), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            version = int(f.read() or 0) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(version))
+
+    def get(self, user_id, key, version):
+        try:
+            with open(self._entry_path(user_id, key), 'rb') as f:
+                header, body = f.read().split(b'\n', 1)
+            entry_version, expires_at = json.loads(header)
+        except (OSError, ValueError):
+            entry_version = None
+        if entry_version != version or expires_at <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def put(self, user_id, key, version, body):
+        header = json.dumps([version, time.time() + self.ttl_seconds]).encode()
+        try:
+            self._write(self._entry_path(user_id, key), header + b'\n' + body)
+        except OSError as e:
+            logger.warning(f"Could not write analytics cache entry: {e}")
+
+
+CACHE_BACKENDS = {
+    'memory': lambda: InProcessAnalyticsCache(Config.ANALYTICS_CACHE_TTL_SECONDS, Config.ANALYTICS_CACHE_MAX_ENTRIES),
+    'local': lambda: LocalAnalyticsCache(Config.ANALYTICS_CACHE_PATH, Config.ANALYTICS_CACHE_TTL_SECONDS),
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analytics_cache():
+    """Return the configured analytics cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CACHE_BACKENDS[Config.ANALYTICS_CACHE_BACKEND]()
+        return _cache
+
+
+def cached_analytics(user_id, endpoint, params, compute):
+    """
+    Serialized JSON for ``compute()``, served from the cache while the user's
+    data is unchanged. The version is read before computing, so a write that
+    commits meanwhile leaves the new entry already stale rather than wrong.
+    """
+    cache = get_analytics_cache()
+    user_id = str(user_id)
+    key = _entry_key(endpoint, params)
+    version = cache.version(user_id)
+    body = cache.get(user_id, key, version)
+    if body is None:
+        body = current_app.json.dumps(compute()).encode()
+        cache.put(user_id, key, version, body)
+    return body
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_written_users(session, flush_context):
+    users = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Progress, AnalysisResult)) and obj.user_id is not None:
+            users.add(str(obj.user_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    users = session.info.pop(_PENDING_KEY, None)
+    if not users:
+        return
+    cache = get_analytics_cache()
+    for user_id in users:
+        try:
+            cache.bump(user_id)
+        except OSError as e:
+            logger.warning(f"Could not invalidate analytics cache for user {user_id}: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
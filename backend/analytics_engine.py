@@ -0,0 +1,107 @@
+"""
+Vectorized analytics over a user's practice history
+
+SessionColumns fetches only the columns the detailed report reads (score,
+created_at, session_duration, exercise_id) in one query, straight into NumPy
+arrays, and every metric is computed from those arrays without per-row
+Python loops. See benchmark_analytics.py for the comparison against the
+ORM-object implementation.
+"""
+
+import numpy as np
+from sqlalchemy import select
+
+from db import db
+from models import Progress
+
+COLUMNS = (Progress.score, Progress.created_at, Progress.session_duration, Progress.exercise_id)
+
+
+def improvement_rate(scores):
+    """
+    Mean of the second half of the scores over the first half, in percent.
+    On a 2-D array, computed independently for each row.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[-1]
+    if n < 2:
+        return np.zeros(scores.shape[:-1]) if scores.ndim > 1 else 0.0
+    avg_first = scores[..., :n // 2].mean(axis=-1)
+    avg_second = scores[..., n // 2:].mean(axis=-1)
+    rate = np.divide((avg_second - avg_first) * 100, avg_first,
+                     out=np.zeros_like(avg_first), where=avg_first > 0)
+    return rate if scores.ndim > 1 else float(rate)
+
+
+class SessionColumns:
+    """A user's Progress rows as parallel NumPy columns, oldest first"""
+
+    def __init__(self, scores, created_at, durations, exercise_ids):
+        self.total_sessions = len(created_at)
+        self.created_at = created_at  # datetime64[us]
+        self.durations = durations
+        self.exercise_ids = exercise_ids  # -1 where the session has no exercise
+
+        # Sessions without a score count towards activity but not towards score metrics
+        scored = ~np.isnan(scores)
+        self.scores = scores[scored]
+        self.scored_at = created_at[scored]
+
+    @classmethod
+    def load(cls, user_id):
+        # Core select: plain tuples, no ORM identity map or instance construction
+        rows = db.session.execute(
+            select(*COLUMNS).where(Progress.user_id == user_id, Progress.created_at.isnot(None))
+            .order_by(Progress.created_at, Progress.id)
+        ).all()
+        if not rows:
+            return cls(np.empty(0), np.empty(0, dtype='datetime64[us]'), np.empty(0), np.empty(0, dtype=np.int64))
+
+        scores, created_at, durations, exercise_ids = zip(*rows)
+        return cls(
+            np.array(scores, dtype=np.float64),  # None becomes NaN
+            np.array(created_at, dtype='datetime64[us]'),
+            np.nan_to_num(np.array(durations, dtype=np.float64)),
+            np.array([-1 if e is None else e for e in exercise_ids], dtype=np.int64)
+        )
+
+    @property
+    def score_count(self):
+        return len(self.scores)
+
+    @property
+    def total_duration(self):
+        return int(self.durations.sum())
+
+    @property
+    def average_score(self):
+        return float(self.scores.mean()) if self.score_count else 0
+
+    @property
+    def best_score(self):
+        return float(self.scores.max()) if self.score_count else 0
+
+    def improvement_rate(self):
+        return improvement_rate(self.scores)
+
+    def recent_average(self, count):
+        recent = self.scores[-count:]
+        return float(recent.mean()) if len(recent) else None
+
+    def phases(self, size):
+        """
+        Consecutive, non-overlapping runs of ``size`` scored sessions that end
+        before the last one. Returns (start times, end times, average scores, trends).
+        """
+        count = max(0, (self.score_count - 1) // size)
+        windows = self.scores[:count * size].reshape(count, size)
+        starts = self.scored_at[0:count * size:size]
+        ends = self.scored_at[size - 1:count * size:size]
+        return starts, ends, windows.mean(axis=1), improvement_rate(windows)
+
+    def quarter_change(self):
+        """Change from the first quarter of the scores to the last, in percent"""
+        quarter = self.score_count // 4
+        q1_avg = self.scores[:quarter].mean()
+        q4_avg = self.scores[-quarter:].mean()
+        return float((q4_avg - q1_avg) / q1_avg * 100) if q1_avg > 0 else 0
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Daily per-user rollups behind the analytics dashboard
+
+Every flush that inserts Progress or AnalysisResult rows also folds them
+into the owner's DailyRollup row for that day, on the same connection, so
+the rollups commit or roll back with the data. A dashboard window of any
+length is then computed from at most one row per day, and weekly or
+monthly trends are grouped in the database so only one row per bucket is
+read back.
+
+Usage: python analytics_rollups.py [user_id ...]   rebuild from Progress/AnalysisResult
+"""
+
+import os
+import sys
+from collections import Counter
+from datetime import date, datetime
+
+import numpy as np
+from sqlalchemy import Date, Integer, String, func, select, insert, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from db import db
+from flush_hooks import after_insert
+from models import Progress, AnalysisResult, DailyRollup
+
+SEVERITIES = ('none', 'mild', 'moderate', 'severe')
+
+
+def utc_today():
+    """Rollup days are the UTC dates of created_at, so windows are anchored to the UTC day"""
+    return datetime.utcnow().date()
+
+
+def _empty_rollup():
+    return {
+        'sessions': 0, 'score_count': 0, 'score_sum': 0, 'score_sq_sum': 0,
+        'score_min': None, 'score_max': None, 'score_histogram': {}, 'duration_sum': 0,
+        'analyses': 0, **{f'analyses_{severity}': 0 for severity in SEVERITIES}
+    }
+
+
+def _fold(values, progress_rows=(), analyses=()):
+    """Add Progress and AnalysisResult rows to a rollup's column values in place"""
+    histogram = dict(values['score_histogram'] or {})
+    for progress in progress_rows:
+        values['sessions'] += 1
+        values['duration_sum'] += progress.session_duration or 0
+        score = progress.score
+        if score is None:
+            continue
+        values['score_count'] += 1
+        values['score_sum'] += score
+        values['score_sq_sum'] += score * score
+        values['score_min'] = score if values['score_min'] is None else min(values['score_min'], score)
+        values['score_max'] = score if values['score_max'] is None else max(values['score_max'], score)
+        histogram[str(score)] = histogram.get(str(score), 0) + 1
+    values['score_histogram'] = histogram
+
+    for analysis in analyses:
+        values['analyses'] += 1
+        if analysis.severity in SEVERITIES:
+            values[f'analyses_{analysis.severity}'] += 1
+    return values
+
+
+@after_insert(Progress, AnalysisResult)
+def _update_rollups_on_insert(connection, rows):
+    inserted = {}
+    for obj in rows:
+        # created_at is stamped in Python by the column default, so it is set once flushed
+        key = (int(obj.user_id), obj.created_at.date())
+        progress_rows, analyses = inserted.setdefault(key, ([], []))
+        (progress_rows if isinstance(obj, Progress) else analyses).append(obj)
+
+    table = DailyRollup.__table__
+    for (user_id, day), (progress_rows, analyses) in inserted.items():
+        where = (table.c.user_id == user_id) & (table.c.day == day)
+        row = connection.execute(select(table).where(where).with_for_update()).mappings().first()
+        if row is None:
+            values = _fold(_empty_rollup(), progress_rows, analyses)
+            connection.execute(insert(table).values(user_id=user_id, day=day, **values))
+        else:
+            values = _fold({column: row[column] for column in _empty_rollup()}, progress_rows, analyses)
+            connection.execute(update(table).where(where).values(**values))
+
+
+class month_bucket(FunctionElement):
+    """'YYYY-MM' of a date or timestamp"""
+    type = String()
+    inherit_cache = True
+
+
+class week_start(FunctionElement):
+    """The Sunday on or before a date, as a date"""
+    type = Date()
+    inherit_cache = True
+
+
+class year_of(FunctionElement):
+    type = Integer()
+    inherit_cache = True
+
+
+# SQLite forms are the default. Format strings are SQL literals rather than bound
+# parameters, so the select list and GROUP BY render identical expressions;
+# post_process_text doubles their % signs for drivers with a format paramstyle
+@compiles(month_bucket)
+def _month_bucket(element, compiler, **kw):
+    return compiler.post_process_text("strftime('%Y-%m', ") + compiler.process(element.clauses, **kw) + ")"
+
+
+@compiles(month_bucket, 'postgresql')
+def _month_bucket_postgresql(element, compiler, **kw):
+    return f"to_char({compiler.process(element.clauses, **kw)}, 'YYYY-MM')"
+
+
+@compiles(week_start)
+def _week_start(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"date({column}, '-' || " + compiler.post_process_text("strftime('%w', ") + f"{column}) || ' days')"
+
+
+@compiles(week_start, 'postgresql')
+def _week_start_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"(CAST({column} AS DATE) - CAST(EXTRACT(DOW FROM {column}) AS INTEGER))"
+
+
+@compiles(year_of)
+def _year_of(element, compiler, **kw):
+    return compiler.post_process_text("CAST(strftime('%Y', ") + compiler.process(element.clauses, **kw) + ") AS INTEGER)"
+
+
+@compiles(year_of, 'postgresql')
+def _year_of_postgresql(element, compiler, **kw):
+    return f"CAST(EXTRACT(YEAR FROM {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+
+def _bucket_totals(user_id, keys, start_day=None, connection=None):
+    """(bucket keys..., sessions, score count, score sum) per bucket of a user's rollups, oldest first"""
+    statement = select(
+        *keys,
+        func.sum(DailyRollup.sessions),
+        func.sum(DailyRollup.score_count),
+        func.sum(DailyRollup.score_sum)
+    ).where(DailyRollup.user_id == user_id)
+    if start_day is not None:
+        statement = statement.where(DailyRollup.day >= start_day)
+    return (connection or db.session).execute(statement.group_by(*keys).order_by(*keys)).all()
+
+
+def weekly_totals(user_id, start_day=None, connection=None):
+    """
+    [(week as '%Y-W%U', score count, score sum)] for weeks with a scored
+    session. Weeks are Sunday-based and split at the new year, as strftime's %U.
+    """
+    rows = _bucket_totals(user_id, (year_of(DailyRollup.day), week_start(DailyRollup.day)), start_day, connection)
+    return [
+        (max(start, date(year, 1, 1)).strftime('%Y-W%U'), int(score_count), score_sum)
+        for year, start, _, score_count, score_sum in rows if score_count
+    ]
+
+
+def monthly_totals(user_id, start_day=None):
+    """[(month as 'YYYY-MM', sessions, score count, score sum)] for months with a session"""
+    rows = _bucket_totals(user_id, (month_bucket(DailyRollup.day),), start_day)
+    return [
+        (month, int(sessions), int(score_count or 0), score_sum or 0)
+        for month, sessions, score_count, score_sum in rows if sessions
+    ]
+
+
+class RollupWindow:
+    """Dashboard metrics over a run of DailyRollup rows (oldest first)"""
+
+    def __init__(self, rollups, user_id=None, start_day=None, connection=None):
+        self.user_id = user_id
+        self.start_day = start_day
+        self.connection = connection  # for queries made inside a flush
+        self.rollups = [r for r in rollups if r.sessions or r.analyses]
+        active = [r for r in self.rollups if r.sessions]
+        self.days = [r.day for r in active]
+        self.day_sessions = np.array([r.sessions for r in active], dtype=np.int64)
+        self.day_score_counts = np.array([r.score_count for r in active], dtype=np.int64)
+        self.day_score_sums = np.array([r.score_sum for r in active], dtype=np.float64)
+
+        self.total_sessions = int(self.day_sessions.sum())
+        self.score_count = int(self.day_score_counts.sum())
+        self.score_sum = float(self.day_score_sums.sum())
+        self.score_sq_sum = float(sum(r.score_sq_sum for r in active))
+        self.total_duration = int(sum(r.duration_sum for r in active))
+        maxima = [r.score_max for r in active if r.score_max is not None]
+        self.best_score = max(maxima) if maxima else 0
+
+        histogram = Counter()
+        for r in active:
+            histogram.update({int(score): count for score, count in (r.score_histogram or {}).items()})
+        self.histogram_scores = np.array(sorted(histogram), dtype=np.int64)
+        self.histogram_cumulative = np.cumsum([histogram[score] for score in self.histogram_scores])
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.score_count if self.score_count else 0
+
+    def std(self):
+        if self.score_count < 2:
+            return 0
+        variance = self.score_sq_sum / self.score_count - self.average_score ** 2
+        return max(variance, 0) ** 0.5
+
+    def nth_score(self, n):
+        """The n-th smallest score (0-based), as sorted(scores)[n]"""
+        return int(self.histogram_scores[np.searchsorted(self.histogram_cumulative, n, side='right')])
+
+    def improvement_rate(self):
+        """
+        Mean of the second half of the scores over the first half, in percent.
+        A day split between the halves is shared in proportion to its sessions.
+        """
+        n = self.score_count
+        if n < 2:
+            return 0
+        half = n // 2
+        cumulative = np.cumsum(self.day_score_counts)
+        first_sum = 0.0
+        for count, total, end in zip(self.day_score_counts, self.day_score_sums, cumulative):
+            start = end - count
+            if end <= half:
+                first_sum += total
+            elif start < half:
+                first_sum += total * (half - start) / count
+        avg_first = first_sum / half
+        avg_second = (self.score_sum - first_sum) / (n - half)
+        return ((avg_second - avg_first) / avg_first * 100) if avg_first > 0 else 0
+
+    def _gap_moments(self):
+        """(count, sum, sum of squares) of day gaps between consecutive sessions"""
+        if len(self.days) == 0:
+            return 0, 0, 0
+        ordinals = np.array([day.toordinal() for day in self.days], dtype=np.int64)
+        between = np.diff(ordinals)
+        # Sessions on the same day are gaps of 0
+        return self.total_sessions - 1, int(between.sum()), int((between ** 2).sum())
+
+    def average_gap(self):
+        count, total, _ = self._gap_moments()
+        return total / count if count > 0 else 0
+
+    def consistency_score(self):
+        if self.total_sessions < 3:
+            return 0
+        count, total, squares = self._gap_moments()
+        avg_gap = total / count
+        gap_variance = squares / count - avg_gap ** 2
+        return min(100, max(0, 100 - gap_variance * 10))
+
+    def weekly_trend(self):
+        return [
+            {'week': week, 'average_score': total / count, 'session_count': count}
+            for week, count, total in weekly_totals(self.user_id, self.start_day, self.connection)
+        ]
+
+    def severity_distribution(self):
+        counts = {severity: sum(getattr(r, f'analyses_{severity}') for r in self.rollups) for severity in SEVERITIES}
+        total = sum(counts.values())
+        return {
+            severity: counts[severity] / total * 100 if total > 0 else 0
+            for severity in ('none', 'mild', 'severe')
+        }
+
+    def sessions_since(self, day):
+        return int(sum(r.sessions for r in self.rollups if r.day >= day))
+
+
+def load_rollups(user_id, start_day, connection=None):
+    """A user's DailyRollup rows from start_day onwards, oldest first, on the session or a given connection"""
+    table = DailyRollup.__table__
+    return (connection or db.session).execute(
+        select(table).where(table.c.user_id == user_id, table.c.day >= start_day).order_by(table.c.day)
+    ).all()
+
+
+def load_window(user_id, start_day, connection=None):
+    """RollupWindow over a user's days from start_day onwards"""
+    return RollupWindow(load_rollups(user_id, start_day, connection), user_id, start_day, connection)
+
+
+def rebuild_rollups(user_ids=None):
+    """Recompute rollups from Progress and AnalysisResult, for backfill or repair"""
+    if not user_ids:
+        user_ids = {user_id for (user_id,) in db.session.query(Progress.user_id).distinct()}
+        user_ids |= {user_id for (user_id,) in db.session.query(AnalysisResult.user_id).distinct()}
+        user_ids.discard(None)
+
+    for user_id in user_ids:
+        user_id = int(user_id)
+        days = {}
+        progress_rows = db.session.query(Progress.created_at, Progress.score, Progress.session_duration)\
+            .filter(Progress.user_id == user_id, Progress.created_at.isnot(None)).yield_per(1000)
+        for progress in progress_rows:
+            _fold(days.setdefault(progress.created_at.date(), _empty_rollup()), progress_rows=[progress])
+        analyses = db.session.query(AnalysisResult.created_at, AnalysisResult.severity)\
+            .filter(AnalysisResult.user_id == user_id, AnalysisResult.created_at.isnot(None)).yield_per(1000)
+        for analysis in analyses:
+            _fold(days.setdefault(analysis.created_at.date(), _empty_rollup()), analyses=[analysis])
+
+        DailyRollup.query.filter_by(user_id=user_id).delete()
+        db.session.add_all(DailyRollup(user_id=user_id, day=day, **values) for day, values in days.items())
+
+    db.session.commit()
+    return len(user_ids)
+
+
+def main():
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Rebuilding daily analytics rollups...")
+        rebuilt = rebuild_rollups([int(arg) for arg in sys.argv[1:]])
+        print(f"✅ Rebuilt rollups for {rebuilt} users")
+
+
+if __name__ == '__main__':
+    main()
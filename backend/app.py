@@ -31,10 +31,19 @@ def create_app():
          supports_credentials=True, 
          origins="*",
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         allow_headers=["Content-Type", "Authorization", "X-Requested-With"])
+         allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Idempotency-Key", "Upload-Offset"])
+
+    # Socket.IO events, delivered to each user's user_<id> room
+    from websocket_events import socketio
+    socketio.init_app(app)
 
     # Import models
     from models import User, Exercise, Progress
+    import analysis_stats  # noqa: F401 - keeps per-user AnalysisStats current on insert
+    import analytics_rollups  # noqa: F401 - keeps DailyRollup current on insert
+    import dashboard_snapshots  # noqa: F401 - marks standard-window DashboardSnapshot rows stale on insert
+    import practice_streaks  # noqa: F401 - keeps PracticeStreak current on insert
+    import analytics_cache  # noqa: F401 - invalidates cached analytics on commit
 
     # Create upload folder
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -73,12 +82,14 @@ def create_app():
     from routes.exercises import exercises_bp
     from routes.progress import progress_bp
     from routes.analysis import analysis_bp
+    from routes.uploads import uploads_bp
     from routes.user import user_bp
     from routes.profile import profile_bp
     from routes.settings import settings_bp
     from routes.community import community_bp
     from routes.analytics import analytics_bp
     from routes.onboarding import onboarding_bp
+    from routes.export import export_bp
     
     # Import notifications blueprint with error handling
     try:
@@ -92,12 +103,14 @@ def create_app():
     app.register_blueprint(exercises_bp, url_prefix='/api/exercises')
     app.register_blueprint(progress_bp, url_prefix='/api/progress')
     app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
+    app.register_blueprint(uploads_bp, url_prefix='/api/analysis/uploads')
     app.register_blueprint(user_bp, url_prefix='/api/user')
     app.register_blueprint(profile_bp, url_prefix='/api/profile')
     app.register_blueprint(settings_bp, url_prefix='/api/settings')
     app.register_blueprint(community_bp, url_prefix='/api/community')
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     app.register_blueprint(onboarding_bp, url_prefix='/api/onboarding')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
 
     # Global error handlers
     @app.errorhandler(404)
@@ -124,6 +137,14 @@ if __name__ == '__main__':
             # Initialize database
             db.create_all()
             print("✅ Database initialized successfully")
+
+        # Archive old recordings in the background
+        from audio_archival import start_archival_worker
+        start_archival_worker(app)
+
+        # Rebuild population benchmark sketches in the background
+        from population_benchmarks import start_benchmark_worker
+        start_benchmark_worker(app)
         
         # Start the server
         print("🚀 Starting Flask server...")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Archive old recordings in the audio store and enforce retention tiers
+
+Recordings whose most recent analysis is older than AUDIO_ARCHIVE_AFTER_DAYS
+are transcoded to FLAC (lossless) or Opus, depending on the retention tier
+each owner picked in their settings (``recordingRetention``). Because the
+store is content-addressed, one recording can belong to several users; it
+is kept at the most faithful tier any of them asked for.
+
+Usage: python audio_archival.py [--dry-run]
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Tier -> (archive format, days after the last analysis before deletion).
+# A format of None keeps the raw upload untouched.
+RETENTION_TIERS = {
+    'full': (None, None),
+    'standard': ('flac', None),
+    'compact': ('opus', None),
+    'minimal': ('opus', Config.RECORDING_DELETE_AFTER_DAYS),
+}
+
+# Most faithful first; a shared recording is stored at the best format any owner wants
+FORMAT_RANK = [None, 'flac', 'opus']
+
+_run_lock = threading.Lock()
+
+
+def user_retention_tier(user):
+    tier = user.get_preferences().get('recordingRetention') if user else None
+    return tier if tier in RETENTION_TIERS else Config.RECORDING_RETENTION_DEFAULT
+
+
+def resolve_policy(tiers):
+    """Combine the tiers of every owner of a recording into (archive format, delete after days)"""
+    archive_format = min((RETENTION_TIERS[tier][0] for tier in tiers), key=FORMAT_RANK.index)
+    delete_days = [RETENTION_TIERS[tier][1] for tier in tiers]
+    # Only delete once every owner's tier allows it, and after the longest of their windows
+    delete_after = None if None in delete_days else max(delete_days)
+    return archive_format, delete_after
+
+
+def transcode(source_path, archive_format, ffmpeg_binary=None):
+    """Transcode a recording to a temporary FLAC/Opus file and return its path"""
+    ffmpeg_binary = ffmpeg_binary or os.environ.get('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if not ffmpeg_binary:
+        raise RuntimeError("ffmpeg is required to archive recordings")
+
+    if archive_format == 'flac':
+        codec = ['-c:a', 'flac', '-compression_level', '8', '-f', 'flac']
+    else:
+        codec = ['-c:a', 'libopus', '-b:a', Config.AUDIO_ARCHIVE_OPUS_BITRATE, '-application', 'voip', '-f', 'ogg']
+
+    fd, output_path = tempfile.mkstemp(dir=os.path.dirname(source_path), suffix=f'.{archive_format}.tmp')
+    os.close(fd)
+    command = [ffmpeg_binary, '-nostdin', '-v', 'error', '-y', '-i', source_path, '-vn', '-map_metadata', '-1'] + codec + [output_path]
+    result = subprocess.run(command, capture_output=True, timeout=Config.AUDIO_ARCHIVE_TIMEOUT_SECONDS)
+    if result.returncode != 0 or os.path.getsize(output_path) == 0:
+        os.unlink(output_path)
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return output_path
+
+
+def archive_recordings(now=None, dry_run=False):
+    """
+    Run one archival pass over the store. Must be called inside an app
+    context. Returns counts and the bytes saved by this pass.
+    """
+    from db import db
+    from models import AnalysisResult, User
+    from audio_store import get_audio_store
+
+    stats = {
+        'scanned': 0,
+        'archived': 0,
+        'deleted': 0,
+        'skipped': 0,
+        'failed': 0,
+        'bytes_before': 0,
+        'bytes_after': 0,
+        'bytes_saved': 0,
+    }
+    if not _run_lock.acquire(blocking=False):
+        logger.info("Archival pass already running, skipping")
+        return stats
+
+    try:
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=Config.AUDIO_ARCHIVE_AFTER_DAYS)
+        store = get_audio_store()
+
+        last_used = db.func.max(AnalysisResult.created_at)
+        candidates = db.session.query(AnalysisResult.audio_sha256, last_used)\
+            .filter(AnalysisResult.audio_sha256.isnot(None))\
+            .group_by(AnalysisResult.audio_sha256)\
+            .having(last_used < cutoff)\
+            .all()
+
+        owners = {}
+        if candidates:
+            digests = [digest for digest, _ in candidates]
+            for digest, user_id in db.session.query(AnalysisResult.audio_sha256, AnalysisResult.user_id)\
+                    .filter(AnalysisResult.audio_sha256.in_(digests)).distinct():
+                owners.setdefault(digest, set()).add(user_id)
+        user_ids = set().union(*owners.values()) if owners else set()
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+
+        for digest, last_analyzed in candidates:
+            stats['scanned'] += 1
+            current_format = store.storage_format(digest)
+            if current_format is None:
+                stats['skipped'] += 1
+                continue
+
+            tiers = [user_retention_tier(users.get(user_id)) for user_id in owners.get(digest, ())]
+            archive_format, delete_after = resolve_policy(tiers or [Config.RECORDING_RETENTION_DEFAULT])
+
+            size = store.size(digest)
+            delete_before = now - timedelta(days=delete_after) if delete_after is not None else None
+            if delete_before is not None and last_analyzed < delete_before:
+                # A raw copy uploaded again since the candidates were read is kept
+                if not dry_run and not store.delete(digest, unused_since=delete_before):
+                    stats['skipped'] += 1
+                    continue
+                stats['deleted'] += 1
+                stats['bytes_saved'] += size
+                continue
+
+            # Only raw uploads are transcoded; an archive is never re-encoded
+            if archive_format is None or current_format != 'raw':
+                stats['skipped'] += 1
+                continue
+
+            try:
+                archive_path = transcode(store.local_path(digest), archive_format)
+            except Exception as e:
+                logger.error(f"Could not archive recording {digest[:12]}: {e}")
+                stats['failed'] += 1
+                continue
+
+            archived_size = os.path.getsize(archive_path)
+            if archived_size >= size:
+                # Already well compressed (e.g. an Opus upload); keep the original
+                os.unlink(archive_path)
+                stats['skipped'] += 1
+                continue
+
+            if dry_run:
+                os.unlink(archive_path)
+            elif not store.put_archive(digest, archive_path, archive_format, unused_since=cutoff):
+                # Uploaded again while it was being transcoded; the original stays
+                stats['skipped'] += 1
+                continue
+            stats['archived'] += 1
+            stats['bytes_before'] += size
+            stats['bytes_after'] += archived_size
+            stats['bytes_saved'] += size - archived_size
+
+        logger.info(
+            f"Archival pass: {stats['archived']} archived, {stats['deleted']} deleted, "
+            f"{stats['failed']} failed, {stats['bytes_saved']} bytes saved"
+        )
+        return stats
+    finally:
+        _run_lock.release()
+
+
+def start_archival_worker(app, interval_seconds=None):
+    """Run archival passes periodically on a daemon thread"""
+    interval_seconds = interval_seconds or Config.AUDIO_ARCHIVE_INTERVAL_SECONDS
+    if interval_seconds <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                with app.app_context():
+                    archive_recordings()
+            except Exception as e:
+                logger.error(f"Archival pass failed: {e}")
+
+    worker = threading.Thread(target=run, name='audio-archival', daemon=True)
+    worker.start()
+    return worker
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def main():
+    from app import app
+
+    dry_run = '--dry-run' in sys.argv[1:]
+    print(f"🔍 Archiving recordings older than {Config.AUDIO_ARCHIVE_AFTER_DAYS} days"
+          f"{' (dry run)' if dry_run else ''}...")
+    with app.app_context():
+        stats = archive_recordings(dry_run=dry_run)
+
+    print(f"📦 Scanned: {stats['scanned']}")
+    print(f"✅ Archived: {stats['archived']}")
+    print(f"🗑️  Deleted: {stats['deleted']}")
+    print(f"⏭️  Skipped: {stats['skipped']}")
+    if stats['failed']:
+        print(f"❌ Failed: {stats['failed']}")
+    print(f"💾 Bytes saved: {format_bytes(stats['bytes_saved'])} "
+          f"({format_bytes(stats['bytes_before'])} -> {format_bytes(stats['bytes_after'])} for archived recordings)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import calendar
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def file_sha256(path):
+    """Hash a file without reading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AudioStore(ABC):
+    """
+    Content-addressed recording store. Recordings are keyed by the SHA-256
+    of their bytes, so identical uploads are stored once and an
+    AnalysisResult can reference its recording by digest.
+    """
+
+    @abstractmethod
+    def put_file(self, path, digest=None, move=False):
+        """
+        Store a file and return its digest; ``move`` lets the store take
+        ownership of ``path``. Only a stored raw copy is deduplicated against:
+        if the recording has been archived, the upload restores the original.
+        """
+
+    @abstractmethod
+    def exists(self, digest):
+        ...
+
+    @abstractmethod
+    def local_path(self, digest):
+        """Path of a local copy of the recording, for the decoder"""
+
+    @abstractmethod
+    def delete(self, digest, unused_since=None):
+        """
+        Remove every copy of a recording. With ``unused_since`` (a naive UTC
+        datetime), a raw copy stored or deduplicated against after it is kept
+        and False is returned.
+        """
+
+    @abstractmethod
+    def size(self, digest):
+        ...
+
+    @abstractmethod
+    def storage_format(self, digest):
+        """'raw' for the original upload, an archive format such as 'flac' or 'opus', or None"""
+
+    @abstractmethod
+    def put_archive(self, digest, archive_path, archive_format, unused_since=None):
+        """
+        Atomically replace the raw recording with a compressed archive copy.
+        ``unused_since`` guards against recent uploads as in ``delete``; when
+        the raw copy wins, the archive file is discarded and False is returned.
+        """
+
+
+ARCHIVE_FORMATS = ('flac', 'opus')
+
+
+class LocalAudioStore(AudioStore):
+    """
+    Hash-sharded store on local disk: <root>/ab/cd/abcd...; writes are atomic
+    renames. Archived recordings sit next to the raw path as <digest>.flac or
+    <digest>.opus and are returned transparently by ``local_path``.
+
+    The raw file's mtime records when it was last stored or deduplicated
+    against. Changes to a digest hold an flock on its shard directory, so
+    uploads and archival passes in any process see each other's changes.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    @contextmanager
+    def _locked(self, digest):
+        import fcntl
+
+        shard = os.path.dirname(self._path(digest))
+        os.makedirs(shard, exist_ok=True)
+        fd = os.open(shard, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def _used_since(self, digest, unused_since):
+        """Whether the raw copy was stored or deduplicated against at or after ``unused_since``"""
+        if unused_since is None:
+            return False
+        try:
+            mtime = os.path.getmtime(self._path(digest))
+        except FileNotFoundError:
+            return False
+        return mtime >= calendar.timegm(unused_since.utctimetuple())
+
+    def _remove_archives(self, digest):
+        path = self._path(digest)
+        for archive_format in ARCHIVE_FORMATS:
+            try:
+                os.unlink(f'{path}.{archive_format}')
+            except FileNotFoundError:
+                pass
+
+    def put_file(self, path, digest=None, move=False):
+        digest = digest or file_sha256(path)
+        target = self._path(digest)
+        with self._locked(digest):
+            if os.path.exists(target):
+                # Mark it as used, so an archival pass already under way leaves it alone
+                os.utime(target)
+                logger.info(f"Recording {digest[:12]} already stored, deduplicated")
+                return digest
+
+            self._store_raw(path, target, move)
+            # The restored original supersedes any archived copy
+            self._remove_archives(digest)
+        return digest
+
+    def _store_raw(self, path, target, move):
+        if move:
+            try:
+                os.replace(path, target)
+                os.utime(target)
+                return
+            except OSError:
+                pass  # different filesystem; fall back to copy + rename
+
+        # Copy next to the target, then rename so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(path, 'rb') as src:
+                shutil.copyfileobj(src, out, READ_CHUNK_SIZE)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, target)
+        except Exception:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _existing_path(self, digest):
+        path = self._path(digest)
+        if os.path.exists(path):
+            return path, 'raw'
+        for archive_format in ARCHIVE_FORMATS:
+            if os.path.exists(f'{path}.{archive_format}'):
+                return f'{path}.{archive_format}', archive_format
+        return None, None
+
+    def exists(self, digest):
+        return self._existing_path(digest)[0] is not None
+
+    def local_path(self, digest):
+        path, _ = self._existing_path(digest)
+        if path is None:
+            raise FileNotFoundError(f"Recording {digest} is not in the store")
+        return path
+
+    def delete(self, digest, unused_since=None):
+        with self._locked(digest):
+            if self._used_since(digest, unused_since):
+                return False
+            try:
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+            self._remove_archives(digest)
+        return True
+
+    def size(self, digest):
+        return os.path.getsize(self.local_path(digest))
+
+    def storage_format(self, digest):
+        return self._existing_path(digest)[1]
+
+    def put_archive(self, digest, archive_path, archive_format, unused_since=None):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {archive_format}")
+        path = self._path(digest)
+        target = f'{path}.{archive_format}'
+        with self._locked(digest):
+            if self._used_since(digest, unused_since):
+                os.unlink(archive_path)
+                return False
+            # The archive lands before the raw file goes, so a reader always finds one of them
+            shutil.move(archive_path, target + '.tmp')
+            os.replace(target + '.tmp', target)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+STORE_BACKENDS = {
+    'local': lambda: LocalAudioStore(Config.AUDIO_STORE_PATH),
+}
+
+
+def get_audio_store():
+    """Return the configured recording store, creating it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = STORE_BACKENDS[Config.AUDIO_STORE_BACKEND]()
+        return _store
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized detailed-report analytics against the ORM-object loops
+
+Fills a throwaway SQLite database with one user's synthetic practice history
+and times both implementations end to end, query included.
+
+Usage: python benchmark_analytics.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Point the app at a scratch database before config is imported
+TMP_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'benchmark.db')
+
+from app import app
+from analytics_rollups import rebuild_rollups
+from db import db
+from models import User, Progress
+from routes.analytics import (
+    calculate_detailed_trends, generate_comparative_analysis,
+    generate_comprehensive_summary, identify_improvement_patterns
+)
+from analytics_engine import SessionColumns
+
+REPEATS = 3
+
+
+def seed(user_id, rows):
+    """Insert a year-spanning history in bulk, bypassing the ORM flush hooks"""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    offsets = np.sort(rng.integers(0, 365 * 24 * 3600, rows))
+    scores = np.clip(rng.normal(70, 12, rows).round(), 0, 100).astype(int)
+    durations = rng.integers(60, 1800, rows)
+    db.session.execute(Progress.__table__.delete())
+    db.session.execute(Progress.__table__.insert(), [
+        {
+            'user_id': user_id, 'exercise_id': int(i % 12) + 1, 'score': int(score),
+            'session_duration': int(duration), 'created_at': start + timedelta(seconds=int(offset)),
+            'date': (start + timedelta(seconds=int(offset))).date()
+        }
+        for i, (offset, score, duration) in enumerate(zip(offsets, scores, durations))
+    ])
+    db.session.commit()
+    # Monthly trends are grouped from the daily rollups, which bulk inserts skip
+    rebuild_rollups([user_id])
+
+
+def legacy_improvement_rate(scores):
+    if len(scores) < 2:
+        return 0
+    first_half = scores[:len(scores)//2]
+    second_half = scores[len(scores)//2:]
+    avg_first = sum(first_half) / len(first_half)
+    avg_second = sum(second_half) / len(second_half)
+    return ((avg_second - avg_first) / avg_first * 100) if avg_first > 0 else 0
+
+
+def legacy_report(user_id):
+    """The detailed-report sections as computed before the engine: full ORM rows and Python loops"""
+    all_progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.created_at).all()
+
+    scores = [p.score for p in all_progress]
+    summary = {
+        'total_sessions': len(all_progress),
+        'total_practice_time': sum(p.session_duration or 0 for p in all_progress),
+        'overall_improvement': legacy_improvement_rate(scores),
+        'recent_average': sum(scores[-10:]) / len(scores[-10:]),
+        'best_score': max(scores)
+    }
+
+    monthly_data = {}
+    for progress in all_progress:
+        month = monthly_data.setdefault(progress.created_at.strftime('%Y-%m'), {'scores': [], 'sessions': 0})
+        month['scores'].append(progress.score)
+        month['sessions'] += 1
+    monthly_trends = [
+        {'month': month, 'average_score': sum(data['scores']) / len(data['scores']), 'session_count': data['sessions']}
+        for month, data in sorted(monthly_data.items())
+    ]
+
+    phases = []
+    for i in range(0, len(scores) - 5, 5):
+        window_scores = scores[i:i + 5]
+        phases.append({
+            'start_date': all_progress[i].created_at.isoformat(),
+            'average_score': sum(window_scores) / len(window_scores),
+            'trend': legacy_improvement_rate(window_scores)
+        })
+
+    quarters = len(scores) // 4
+    comparative = {
+        'user_average': sum(scores) / len(scores),
+        'user_improvement': legacy_improvement_rate(scores),
+        'quarter_change': (sum(scores[-quarters:]) / quarters - sum(scores[:quarters]) / quarters)
+                          / (sum(scores[:quarters]) / quarters) * 100
+    }
+    return summary, monthly_trends, phases, comparative
+
+
+def vectorized_report(user_id):
+    sessions = SessionColumns.load(user_id)
+    return (
+        generate_comprehensive_summary(sessions, user_id),
+        calculate_detailed_trends(user_id),
+        identify_improvement_patterns(sessions),
+        generate_comparative_analysis(sessions)
+    )
+
+
+def check_agreement(user_id):
+    """Both implementations must produce the same numbers"""
+    summary, monthly_trends, phases, comparative = legacy_report(user_id)
+    new_summary, new_trends, new_patterns, new_comparative = vectorized_report(user_id)
+
+    assert new_summary['total_sessions'] == summary['total_sessions']
+    assert new_summary['total_practice_time'] == summary['total_practice_time']
+    assert np.isclose(new_summary['overall_improvement'], summary['overall_improvement'])
+    assert [m['month'] for m in new_trends['monthly_trends']] == [m['month'] for m in monthly_trends]
+    assert np.allclose([m['average_score'] for m in new_trends['monthly_trends']],
+                       [m['average_score'] for m in monthly_trends])
+    assert [p['start_date'] for p in new_patterns['improvement_phases']] == [p['start_date'] for p in phases]
+    assert np.allclose([p['trend'] for p in new_patterns['improvement_phases']], [p['trend'] for p in phases])
+    assert np.isclose(new_comparative['score_comparison']['user_average'], comparative['user_average'])
+
+
+def time_report(report, user_id):
+    timings = []
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        report(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Benchmark', email='benchmark@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        print(f"🔍 Benchmarking detailed-report analytics (best of {REPEATS})\n")
+        print(f"{'rows':>8} {'ORM loops ms':>13} {'vectorized ms':>14} {'speedup':>8}")
+
+        for rows in sizes:
+            seed(user.id, rows)
+            check_agreement(user.id)
+            legacy_ms = time_report(legacy_report, user.id)
+            vectorized_ms = time_report(vectorized_report, user.id)
+            print(f"{rows:>8} {legacy_ms:>13.1f} {vectorized_ms:>14.1f} {legacy_ms / vectorized_ms:>7.1f}x")
+
+        db.session.remove()
+        db.engine.dispose()
+
+    print("\n✅ Both implementations agree")
+
+
+if __name__ == '__main__':
+    main()
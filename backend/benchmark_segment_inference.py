@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark parallel segment inference against serial inference per core count
+
+A randomly initialized, reduced-size Wav2Vec2 classifier runs one long
+recording's segments three ways on 1, 2, 4, ... cores:
+serial (one segment at a time, all cores as intra-op threads), uncapped
+(one worker per core, each with the full intra-op pool, as the old
+default) and capped (INFERENCE_WORKERS workers sharing the cores).
+
+Usage: python benchmark_segment_inference.py [recording seconds]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+
+SAMPLE_RATE = 16000
+SEGMENT_SECONDS = 20
+CAPPED_WORKERS = 2
+REPEATS = 2
+
+
+def build_model():
+    torch.manual_seed(0)
+    config = Wav2Vec2Config(hidden_size=384, num_hidden_layers=6, num_attention_heads=6,
+                            intermediate_size=1536, num_labels=2)
+    return Wav2Vec2ForSequenceClassification(config).eval()
+
+
+def predict(model, segment):
+    with torch.no_grad():
+        return torch.softmax(model(segment.unsqueeze(0)).logits, dim=-1)[0][1].item()
+
+
+def run(model, segments, workers, threads):
+    torch.set_num_threads(threads)
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        if workers == 1:
+            for segment in segments:
+                predict(model, segment)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda segment: predict(model, segment), segments))
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def core_counts(available):
+    counts, count = [], 1
+    while count < available:
+        counts.append(count)
+        count *= 2
+    return counts + [available]
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 80
+    waveform = torch.randn(int(seconds * SAMPLE_RATE))
+    length = SEGMENT_SECONDS * SAMPLE_RATE
+    segments = [waveform[start:start + length] for start in range(0, len(waveform), length)]
+
+    cores = sorted(os.sched_getaffinity(0))
+    model = build_model()
+    predict(model, segments[0])  # warm up
+
+    print(f"🔍 {len(segments)} segments of {SEGMENT_SECONDS}s, best of {REPEATS}\n")
+    print(f"{'cores':>5} {'serial s':>9} {'uncapped s':>11} {'capped s':>9} {'capped speedup':>15}")
+    for count in core_counts(len(cores)):
+        os.sched_setaffinity(0, cores[:count])
+        serial = run(model, segments, 1, count)
+        uncapped = run(model, segments, count, count)
+        workers = min(CAPPED_WORKERS, count)
+        capped = run(model, segments, workers, max(1, count // workers))
+        print(f"{count:>5} {serial:>9.2f} {uncapped:>11.2f} {capped:>9.2f} {serial / capped:>14.2f}x")
+    os.sched_setaffinity(0, cores)
+
+    print("\n✅ Done")
+
+
+if __name__ == '__main__':
+    main()
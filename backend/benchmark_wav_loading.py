@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory-mapped WAV fast path against torchaudio.load
+
+Usage: python benchmark_wav_loading.py [seconds ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ml.wav_reader import open_wav
+
+SAMPLE_RATE = 16000
+REPEATS = 5
+
+
+def write_test_wav(path, seconds, channels=1):
+    """Write a 16-bit PCM WAV of random noise"""
+    frames = int(seconds * SAMPLE_RATE)
+    samples = (np.random.uniform(-0.5, 0.5, (frames, channels)) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+
+def load_with_torchaudio(path):
+    """The loader _predict_with_model used before the fast path"""
+    import torch
+    import torchaudio
+
+    waveform, sample_rate = torchaudio.load(path)
+    if waveform.shape[0] > 1:
+        waveform = torch.mean(waveform, dim=0, keepdim=True)
+    return waveform.squeeze()
+
+
+def load_with_fast_path(path, out):
+    with open_wav(path) as wav:
+        return wav.to_float32(out=out)
+
+
+def time_loader(loader, *args):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        loader(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    durations = [float(arg) for arg in sys.argv[1:]] or [10, 60, 600]
+
+    try:
+        import torchaudio  # noqa: F401
+        torchaudio_available = True
+    except ImportError:
+        print("⚠️  torchaudio not installed, only timing the fast path")
+        torchaudio_available = False
+
+    print(f"🔍 Benchmarking WAV loading (best of {REPEATS})\n")
+    print(f"{'duration':>10} {'channels':>9} {'torchaudio ms':>14} {'fast path ms':>13} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in durations:
+            for channels in (1, 2):
+                path = os.path.join(tmp, f'bench_{seconds}_{channels}.wav')
+                write_test_wav(path, seconds, channels)
+                out = np.empty(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+                fast_ms = time_loader(load_with_fast_path, path, out)
+                if torchaudio_available:
+                    torch_ms = time_loader(load_with_torchaudio, path)
+                    speedup = f"{torch_ms / fast_ms:.1f}x"
+                    torch_column = f"{torch_ms:.2f}"
+                else:
+                    speedup = torch_column = '-'
+
+                print(f"{seconds:>9.0f}s {channels:>9} {torch_column:>14} {fast_ms:>13.2f} {speedup:>8}")
+
+
+if __name__ == '__main__':
+    main()
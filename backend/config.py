@@ -7,6 +7,38 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-change-in-production'
     UPLOAD_FOLDER = 'uploads'
+    AUDIO_STORE_BACKEND = os.environ.get('AUDIO_STORE_BACKEND') or 'local'
+    AUDIO_STORE_PATH = os.environ.get('AUDIO_STORE_PATH') or os.path.join(os.path.dirname(__file__), 'recordings')
+    AUDIO_ARCHIVE_AFTER_DAYS = int(os.environ.get('AUDIO_ARCHIVE_AFTER_DAYS', 30))
+    AUDIO_ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('AUDIO_ARCHIVE_INTERVAL_SECONDS', 6 * 60 * 60))  # 0 disables
+    AUDIO_ARCHIVE_OPUS_BITRATE = os.environ.get('AUDIO_ARCHIVE_OPUS_BITRATE') or '32k'
+    AUDIO_ARCHIVE_TIMEOUT_SECONDS = int(os.environ.get('AUDIO_ARCHIVE_TIMEOUT_SECONDS', 600))
+    RECORDING_RETENTION_DEFAULT = os.environ.get('RECORDING_RETENTION_DEFAULT') or 'standard'
+    RECORDING_DELETE_AFTER_DAYS = int(os.environ.get('RECORDING_DELETE_AFTER_DAYS', 90))  # 'minimal' tier
+    DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE') or 'UTC'  # for users without a timezone setting
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=12)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    CHUNKED_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024  # 1GB max resumable upload
+    CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # suggested chunk size, below MAX_CONTENT_LENGTH
+    CHUNKED_UPLOAD_EXPIRE_SECONDS = int(os.environ.get('CHUNKED_UPLOAD_EXPIRE_SECONDS', 24 * 60 * 60))  # after the last chunk
+    UPLOAD_SWEEP_INTERVAL_SECONDS = int(os.environ.get('UPLOAD_SWEEP_INTERVAL_SECONDS', 60 * 60))  # 0 disables
+    BATCH_UPLOAD_MAX_FILES = int(os.environ.get('BATCH_UPLOAD_MAX_FILES', 20))
+    BATCH_ANALYSIS_WORKERS = int(os.environ.get('BATCH_ANALYSIS_WORKERS', 4))
+    RESULTS_CACHE_MAX_BYTES = int(os.environ.get('RESULTS_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    ANALYTICS_CACHE_BACKEND = os.environ.get('ANALYTICS_CACHE_BACKEND') or 'memory'  # memory, local
+    ANALYTICS_CACHE_PATH = os.environ.get('ANALYTICS_CACHE_PATH') or os.path.join(os.path.dirname(__file__), 'analytics_cache')
+    ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', 300))
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', 10000))
+    # Dashboard windows (in days) kept precomputed per user; other lengths are computed on request
+    DASHBOARD_SNAPSHOT_WINDOWS = tuple(
+        int(days) for days in os.environ.get('DASHBOARD_SNAPSHOT_WINDOWS', '7,30,90').split(',') if days.strip()
+    )
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    REPORT_SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get('REPORT_SNAPSHOT_MAX_AGE_SECONDS', 60 * 60))
+    REPORT_JOB_TIMEOUT_SECONDS = int(os.environ.get('REPORT_JOB_TIMEOUT_SECONDS', 10 * 60))  # then a new job may start
+    BENCHMARK_INTERVAL_SECONDS = int(os.environ.get('BENCHMARK_INTERVAL_SECONDS', 6 * 60 * 60))  # 0 disables
+    BENCHMARK_RELOAD_SECONDS = int(os.environ.get('BENCHMARK_RELOAD_SECONDS', 5 * 60))  # how often workers reread sketches
+    EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 1000))  # rows per server-side cursor fetch
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+    IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 120))
@@ -0,0 +1,96 @@
+"""
+Precomputed dashboards for the standard windows
+
+The dashboard is mostly asked for the last 7, 30 and 90 days
+(DASHBOARD_SNAPSHOT_WINDOWS). Each user has a DashboardSnapshot row per
+standard window holding the finished payload and the (UTC) day the window
+was anchored to. A flush that inserts Progress or AnalysisResult rows only
+bumps the owner's ``changes`` counters, so writes never pay for a rebuild.
+Reading a standard window is a primary-key lookup while its data was built
+at the current counter and day; otherwise every window is rebuilt from one
+read of the longest window's daily rollups and recent sessions, sliced for
+the shorter windows. Other window lengths are computed on demand.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from analytics_rollups import RollupWindow, load_rollups, utc_today
+from config import Config
+from db import db
+from flush_hooks import after_insert
+from models import Progress, AnalysisResult, DashboardSnapshot
+
+
+def build_snapshots(user_id, connection=None, today=None):
+    """{days: dashboard} for every standard window, from one read of the longest one"""
+    # routes.analytics imports this module, so its builders are imported here
+    from routes.analytics import build_dashboard, load_recent_sessions
+
+    today = today or utc_today()
+    windows = sorted(Config.DASHBOARD_SNAPSHOT_WINDOWS)
+    earliest = today - timedelta(days=windows[-1])
+    rollups = load_rollups(user_id, earliest, connection)
+    recent_sessions = load_recent_sessions(user_id, earliest, connection)
+
+    dashboards = {}
+    for days in windows:
+        start_day = today - timedelta(days=days)
+        start = datetime.combine(start_day, datetime.min.time())
+        window = RollupWindow([r for r in rollups if r.day >= start_day], user_id, start_day, connection)
+        # The longest window's last sessions include every shorter window's last sessions
+        dashboards[days] = build_dashboard(window, [s for s in recent_sessions if s.created_at >= start])
+    return dashboards
+
+
+def _store(connection, user_id, dashboards, today, built_from):
+    """
+    Save rebuilt windows as of the ``changes`` values read before the
+    rebuild; an insert committed meanwhile has bumped ``changes`` past
+    them, so the next read rebuilds again.
+    """
+    table = DashboardSnapshot.__table__
+    for days, data in dashboards.items():
+        where = (table.c.user_id == user_id) & (table.c.days == days)
+        values = {'anchor_day': today, 'data': data, 'updated_at': datetime.utcnow()}
+        if days in built_from:
+            connection.execute(update(table).where(where).values(built_from=built_from[days], **values))
+        else:
+            connection.execute(insert(table).values(user_id=user_id, days=days, changes=0, built_from=0, **values))
+
+
+def get_dashboard_snapshot(user_id, days):
+    """The dashboard for a standard window, rebuilding the user's windows if data or day have changed"""
+    user_id = int(user_id)
+    today = utc_today()
+    table = DashboardSnapshot.__table__
+    connection = db.session.connection()
+    rows = {row.days: row for row in connection.execute(
+        select(table.c.days, table.c.anchor_day, table.c.changes, table.c.built_from, table.c.data)
+        .where(table.c.user_id == user_id)
+    )}
+    snapshot = rows.get(days)
+    if snapshot is not None and snapshot.anchor_day == today and snapshot.built_from == snapshot.changes:
+        return snapshot.data
+
+    dashboards = build_snapshots(user_id, connection, today)
+    try:
+        _store(connection, user_id, dashboards, today, {d: row.changes for d, row in rows.items()})
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request stored the same windows first
+        db.session.rollback()
+    return dashboards[days]
+
+
+@after_insert(Progress, AnalysisResult)
+def _mark_snapshots_on_insert(connection, rows):
+    if not Config.DASHBOARD_SNAPSHOT_WINDOWS:
+        return
+    user_ids = {int(obj.user_id) for obj in rows}
+    table = DashboardSnapshot.__table__
+    connection.execute(
+        update(table).where(table.c.user_id.in_(user_ids)).values(changes=table.c.changes + 1)
+    )
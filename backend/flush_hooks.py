@@ -0,0 +1,28 @@
+"""
+Summaries maintained in the same transaction as the rows they summarize
+
+Per-user aggregates (analysis stats, daily rollups, practice streaks,
+dashboard snapshot counters) are kept current by handlers that run after
+every flush inserting the rows they depend on. Handlers get the flush's
+connection and issue Core statements on it, so their writes commit or roll
+back with the data and never trigger a re-entrant ORM flush.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def after_insert(*models):
+    """
+    Register ``handler(connection, inserted)`` to run after each flush that
+    inserts instances of ``models`` owned by a user; ``inserted`` lists them.
+    Handlers do not depend on each other, so their order does not matter.
+    """
+    def register(handler):
+        @event.listens_for(Session, 'after_flush')
+        def _run(session, flush_context):
+            inserted = [obj for obj in session.new if isinstance(obj, models) and obj.user_id is not None]
+            if inserted:
+                handler(session.connection(), inserted)
+        return handler
+    return register
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import request, jsonify, make_response
+from flask_jwt_extended import get_jwt_identity
+from config import Config
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class _Entry:
+    def __init__(self, fingerprint=None):
+        self.fingerprint = fingerprint  # request_fingerprint() of the request that owns the key
+        self.done = threading.Event()
+        self.response = None  # (body, status, headers) once the work has finished
+        self.expires_at = None
+
+
+class IdempotencyStore:
+    """
+    Small in-process store of responses keyed by idempotency key.
+
+    The first request for a key runs the view; concurrent duplicates block on
+    the in-flight entry and replay its response once it lands. Entries expire
+    after ``ttl_seconds``.
+
+    Entries live in this process only: with several server processes (e.g.
+    gunicorn workers) a retry that lands on another worker runs the view
+    again, so deployments relying on idempotent retries run a single process.
+    """
+
+    def __init__(self, ttl_seconds=24 * 60 * 60, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key, fingerprint=None):
+        """Return ``(entry, is_owner)``; the owner must call ``finish`` or ``abandon``"""
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = _Entry(fingerprint)
+            self._entries[key] = entry
+            return entry, True
+
+    def finish(self, key, entry, response):
+        with self._lock:
+            entry.response = response
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+        entry.done.set()
+
+    def abandon(self, key, entry):
+        """Drop an in-flight entry so a retry can redo the work"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if e.expires_at is not None and e.expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+
+        # Evict the oldest finished entries if the store is still too large
+        if len(self._entries) >= self.max_entries:
+            finished = sorted(
+                (e.expires_at, k) for k, e in self._entries.items() if e.expires_at is not None
+            )
+            for _, k in finished[:len(self._entries) - self.max_entries + 1]:
+                del self._entries[k]
+
+
+store = IdempotencyStore(ttl_seconds=Config.IDEMPOTENCY_TTL_SECONDS)
+
+
+def request_fingerprint():
+    """
+    SHA-256 of what a request asks for: its form fields and uploaded file
+    contents, or the raw body. Multipart boundaries differ between retries
+    of the same upload, so form requests are not hashed byte for byte.
+    """
+    digest = hashlib.sha256()
+    if request.files or request.form:
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f'{name}={value}\0'.encode())
+        for name, upload in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f'{name}\0'.encode())
+            for chunk in iter(lambda: upload.stream.read(READ_CHUNK_SIZE), b''):
+                digest.update(chunk)
+            digest.update(b'\0')
+            upload.stream.seek(0)
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def idempotent(view):
+    """
+    Replay the original response for requests carrying a repeated
+    ``Idempotency-Key`` header; a key reused with a different request gets
+    422. Must be applied inside ``jwt_required``.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} header is too long'}), 400
+
+        scoped_key = (get_jwt_identity(), request.method, request.path, key)
+        fingerprint = request_fingerprint()
+        entry, is_owner = store.begin(scoped_key, fingerprint)
+
+        if not is_owner:
+            if entry.fingerprint != fingerprint:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+            if not entry.done.wait(Config.IDEMPOTENCY_WAIT_SECONDS) or entry.response is None:
+                return jsonify({'error': 'A request with this idempotency key is still in progress'}), 409
+            body, status, headers = entry.response
+            response = make_response(body, status, headers)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            store.abandon(scoped_key, entry)
+            raise
+
+        # Server errors are not remembered so the client can retry them
+        if response.status_code >= 500:
+            store.abandon(scoped_key, entry)
+        else:
+            store.finish(scoped_key, entry, (response.get_data(), response.status_code, dict(response.headers)))
+        return response
+
+    return wrapper
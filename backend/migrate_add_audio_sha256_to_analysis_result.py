@@ -0,0 +1,14 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('analysis_result')]
+    if 'audio_sha256' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE analysis_result ADD COLUMN audio_sha256 VARCHAR(64)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_analysis_result_audio_sha256 ON analysis_result (audio_sha256)'))
+        print("✅ 'audio_sha256' column added to analysis_result table.")
+    else:
+        print("'audio_sha256' column already exists.")
@@ -0,0 +1,18 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    if 'dashboard_snapshot' not in inspector.get_table_names():
+        db.create_all()
+        print("✅ dashboard_snapshot table created.")
+    else:
+        columns = [col['name'] for col in inspector.get_columns('dashboard_snapshot')]
+        for column in ('changes', 'built_from'):
+            if column not in columns:
+                with db.engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE dashboard_snapshot ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0'))
+                print(f"✅ '{column}' column added to dashboard_snapshot table.")
+            else:
+                print(f"'{column}' column already exists.")
@@ -0,0 +1,13 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    indexes = [index['name'] for index in inspector.get_indexes('progress')]
+    if 'ix_progress_user_exercise_created' not in indexes:
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE INDEX ix_progress_user_exercise_created ON progress (user_id, exercise_id, created_at)'))
+        print("✅ 'ix_progress_user_exercise_created' index added to progress table.")
+    else:
+        print("'ix_progress_user_exercise_created' index already exists.")
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from db import db
+from app import app
+from config import Config
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('upload_session')]
+    if 'expires_at' not in columns:
+        column_type = 'TIMESTAMP' if db.engine.dialect.name == 'postgresql' else 'DATETIME'
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE upload_session ADD COLUMN expires_at {column_type}'))
+        print("✅ 'expires_at' column added to upload_session table.")
+    else:
+        print("'expires_at' column already exists.")
+
+    # Unfinished uploads from before the column existed get a full expiry window from now
+    expires_at = datetime.utcnow() + timedelta(seconds=Config.CHUNKED_UPLOAD_EXPIRE_SECONDS)
+    with db.engine.begin() as conn:
+        updated = conn.execute(
+            text("UPDATE upload_session SET expires_at = :expires_at WHERE expires_at IS NULL AND status != 'finalized'"),
+            {'expires_at': expires_at}
+        ).rowcount
+    print(f"✅ Set an expiry on {updated} unfinished uploads.")
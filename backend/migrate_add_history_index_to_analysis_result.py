@@ -0,0 +1,33 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+
+def normalize_created_at(conn):
+    """
+    SQLite keeps DateTime values as text. Rows stamped by CURRENT_TIMESTAMP lack
+    the microseconds SQLAlchemy writes, so they sort below a cursor from the
+    same second; pad them to the same format. Returns the rows updated.
+    """
+    if conn.dialect.name != 'sqlite':
+        return 0
+    result = conn.execute(text(
+        "UPDATE analysis_result SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+    ))
+    return result.rowcount
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        inspector = inspect(db.engine)
+        indexes = [index['name'] for index in inspector.get_indexes('analysis_result')]
+        if 'ix_analysis_result_user_created_id' not in indexes:
+            with db.engine.begin() as conn:
+                conn.execute(text('CREATE INDEX ix_analysis_result_user_created_id ON analysis_result (user_id, created_at, id)'))
+            print("✅ 'ix_analysis_result_user_created_id' index added to analysis_result table.")
+        else:
+            print("'ix_analysis_result_user_created_id' index already exists.")
+
+        with db.engine.begin() as conn:
+            normalized = normalize_created_at(conn)
+        print(f"✅ Normalized created_at on {normalized} analysis_result rows.")
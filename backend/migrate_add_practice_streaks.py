@@ -0,0 +1,20 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+from practice_streaks import rebuild_streaks
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    indexes = [index['name'] for index in inspector.get_indexes('progress')]
+    if 'ix_progress_user_date' not in indexes:
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE INDEX ix_progress_user_date ON progress (user_id, date)'))
+        print("✅ 'ix_progress_user_date' index added to progress table.")
+    else:
+        print("'ix_progress_user_date' index already exists.")
+
+    if 'practice_streak' not in inspector.get_table_names():
+        db.create_all()
+        print("✅ practice_streak table created.")
+    rebuilt = rebuild_streaks()
+    print(f"✅ Backfilled practice streaks for {rebuilt} users.")
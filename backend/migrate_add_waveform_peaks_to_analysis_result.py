@@ -0,0 +1,29 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('analysis_result')]
+    if 'waveform_peaks' not in columns:
+        column_type = 'BYTEA' if db.engine.dialect.name == 'postgresql' else 'BLOB'
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE analysis_result ADD COLUMN waveform_peaks {column_type}'))
+        print("✅ 'waveform_peaks' column added to analysis_result table.")
+    else:
+        print("'waveform_peaks' column already exists.")
+
+    # Backfill peaks for stored recordings analyzed before the column existed
+    from models import AnalysisResult
+    from audio_store import get_audio_store
+    from routes.analysis import waveform_peaks_for
+
+    store = get_audio_store()
+    filled = 0
+    for analysis in AnalysisResult.query.filter(AnalysisResult.waveform_peaks.is_(None),
+                                                AnalysisResult.audio_sha256.isnot(None)):
+        if store.exists(analysis.audio_sha256):
+            analysis.waveform_peaks = waveform_peaks_for(store.local_path(analysis.audio_sha256))
+            filled += analysis.waveform_peaks is not None
+    db.session.commit()
+    print(f"✅ Backfilled waveform peaks for {filled} analyses.")
@@ -0,0 +1,24 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+
+with app.app_context():
+    # Creates the analysis_detail table
+    db.create_all()
+
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('analysis_result')]
+    if 'analysis_data' in columns:
+        with db.engine.begin() as conn:
+            moved = conn.execute(text(
+                'INSERT INTO analysis_detail (analysis_id, analysis_data) '
+                'SELECT id, analysis_data FROM analysis_result '
+                'WHERE analysis_data IS NOT NULL '
+                'AND id NOT IN (SELECT analysis_id FROM analysis_detail)'
+            )).rowcount
+            conn.execute(text('ALTER TABLE analysis_result DROP COLUMN analysis_data'))
+        print(f"✅ Moved analysis_data for {moved} analyses to analysis_detail.")
+        if db.engine.dialect.name == 'sqlite':
+            print("Run VACUUM on the database to reclaim the space.")
+    else:
+        print("'analysis_data' already moved to analysis_detail.")
@@ -0,0 +1,30 @@
+from db import db
+from app import app
+from sqlalchemy import inspect, text
+from audio_store import get_audio_store
+import os
+
+# Recordings are resolved through audio_sha256 and the audio store; the stored path
+# went stale as soon as archival re-encoded or moved a recording
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('analysis_result')]
+    if 'audio_file_path' in columns:
+        store = get_audio_store()
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, audio_file_path FROM analysis_result '
+                'WHERE audio_sha256 IS NULL AND audio_file_path IS NOT NULL'
+            )).fetchall()
+            moved = 0
+            for analysis_id, path in rows:
+                if not os.path.exists(path):
+                    continue
+                digest = store.put_file(path)
+                conn.execute(text('UPDATE analysis_result SET audio_sha256 = :digest WHERE id = :id'),
+                             {'digest': digest, 'id': analysis_id})
+                moved += 1
+            conn.execute(text('ALTER TABLE analysis_result DROP COLUMN audio_file_path'))
+        print(f"✅ Moved {moved} recordings into the audio store and dropped 'audio_file_path'.")
+    else:
+        print("'audio_file_path' column already removed.")
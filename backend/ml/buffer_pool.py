@@ -0,0 +1,114 @@
+import os
+import threading
+import logging
+from typing import Dict, Any
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+MIN_SIZE_CLASS = 1 << 14   # ~1 second of 16kHz audio
+MAX_SIZE_CLASS = 1 << 25   # ~35 minutes of 16kHz audio
+
+
+class PooledBuffer:
+    """A float32 buffer borrowed from the pool; ``length`` samples are valid"""
+
+    def __init__(self, tensor: torch.Tensor, size_class: int, pooled: bool):
+        self.tensor = tensor
+        self.array = tensor.numpy()
+        self.size_class = size_class
+        self.pooled = pooled
+        self.length = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.size_class
+
+    def view(self) -> torch.Tensor:
+        """Tensor view of the valid samples (no copy)"""
+        return self.tensor[:self.length]
+
+
+class BufferPool:
+    """
+    Reusable pool of size-classed float32 buffers for the inference hot path.
+
+    Buffers are bucketed by power-of-two sample counts and pinned when CUDA is
+    available so host-to-device copies can be asynchronous. Decode, mono
+    mixdown and normalization write into these buffers in place instead of
+    allocating fresh tensors per request.
+    """
+
+    def __init__(self, max_per_class: int = 4, pin_memory: bool = None):
+        self.max_per_class = max_per_class
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        self._free = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'allocations': 0,
+            'reuses': 0,
+            'oversize_allocations': 0,
+            'allocated_bytes': 0
+        }
+
+    @staticmethod
+    def size_class_for(num_samples: int) -> int:
+        size_class = MIN_SIZE_CLASS
+        while size_class < num_samples:
+            size_class <<= 1
+        return size_class
+
+    def acquire(self, num_samples: int) -> PooledBuffer:
+        """Borrow a buffer holding at least ``num_samples`` float32 samples"""
+        size_class = self.size_class_for(num_samples)
+        with self._lock:
+            self._stats['requests'] += 1
+            free = self._free.get(size_class)
+            if free:
+                self._stats['reuses'] += 1
+                return free.pop()
+
+            self._stats['allocations'] += 1
+            self._stats['allocated_bytes'] += size_class * 4
+            if size_class > MAX_SIZE_CLASS:
+                self._stats['oversize_allocations'] += 1
+
+        tensor = torch.empty(size_class, dtype=torch.float32, pin_memory=self.pin_memory)
+        return PooledBuffer(tensor, size_class, pooled=size_class <= MAX_SIZE_CLASS)
+
+    def release(self, buffer: PooledBuffer):
+        """Return a buffer to the pool; oversize buffers are simply dropped"""
+        if buffer is None or not buffer.pooled:
+            return
+        buffer.length = 0
+        with self._lock:
+            free = self._free.setdefault(buffer.size_class, [])
+            if len(free) < self.max_per_class:
+                free.append(buffer)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return allocation counts. ``requests`` is how many buffers the hot
+        path would have allocated without the pool; ``allocations`` is how
+        many were actually allocated.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pooled_buffers'] = sum(len(free) for free in self._free.values())
+            stats['pinned'] = self.pin_memory
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    """Return the shared buffer pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BufferPool(max_per_class=int(os.environ.get('AUDIO_BUFFERS_PER_CLASS', 4)))
+        return _pool
@@ -0,0 +1,352 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from math import gcd
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from ml.wav_reader import open_wav, UnsupportedWavError
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+# File extension to store each sniffed container under
+CONTAINER_EXTENSIONS = {
+    'wav': 'wav',
+    'webm': 'webm',
+    'ogg': 'ogg',
+    'flac': 'flac',
+    'mp3': 'mp3',
+    'mp4': 'm4a',
+}
+
+# Containers libsndfile can decode without ffmpeg
+SOUNDFILE_CONTAINERS = {'wav', 'flac', 'ogg'}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# An ffmpeg run taking longer than this is killed so it cannot hold a worker forever
+DEFAULT_FFMPEG_TIMEOUT = 300.0
+FFPROBE_TIMEOUT = 10.0
+
+# Initial pooled buffer for ffmpeg output when the duration cannot be probed
+# (e.g. MediaRecorder WebM, which carries none); it doubles as needed
+UNPROBED_BUFFER_SAMPLES = 60 * TARGET_SAMPLE_RATE
+
+
+def sniff_container(header: bytes) -> str:
+    """Detect the real audio container from the first bytes of a file"""
+    if len(header) >= 12 and header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'\x1a\x45\xdf\xa3':  # EBML (WebM / Matroska)
+        return 'webm'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if len(header) >= 8 and header[4:8] == b'ftyp':
+        return 'mp4'
+    if header[:3] == b'ID3' or (len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0):
+        return 'mp3'
+    return 'unknown'
+
+
+def sniff_file(audio_path: str) -> str:
+    """Detect the real audio container of a file on disk"""
+    with open(audio_path, 'rb') as f:
+        return sniff_container(f.read(32))
+
+
+class DecodeError(Exception):
+    """Raised when an audio file cannot be decoded"""
+
+
+class DecodedAudio:
+    def __init__(self, samples: np.ndarray, container: str, decode_ms: float, buffer=None):
+        self.samples = samples
+        self.sample_rate = TARGET_SAMPLE_RATE
+        self.container = container
+        self.decode_ms = decode_ms
+        self.buffer = buffer  # pooled buffer backing ``samples``, if any
+
+    @property
+    def duration_seconds(self) -> float:
+        return len(self.samples) / float(self.sample_rate)
+
+
+class AudioDecoderPool:
+    """
+    Pool of persistent decoder worker threads.
+
+    Each worker streams a file through ffmpeg straight to 16 kHz mono float32
+    (or through libsndfile when ffmpeg is unavailable), so browser WebM/Opus
+    uploads no longer fall through to the fallback analysis.
+    """
+
+    def __init__(self, max_workers: int = 2, ffmpeg_binary: Optional[str] = None,
+                 ffmpeg_timeout: float = DEFAULT_FFMPEG_TIMEOUT):
+        self.max_workers = max_workers
+        self.ffmpeg_binary = ffmpeg_binary or shutil.which('ffmpeg')
+        self.ffprobe_binary = self._find_ffprobe()
+        self.ffmpeg_timeout = ffmpeg_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='audio-decoder')
+        self._lock = threading.Lock()
+        self._stats = {
+            'decoded': 0,
+            'failed': 0,
+            'total_decode_ms': 0.0,
+            'last_decode_ms': 0.0,
+            'by_container': {}
+        }
+
+        if not self.ffmpeg_binary:
+            logger.warning("ffmpeg not found, only WAV/FLAC/OGG uploads can be decoded")
+
+    def _find_ffprobe(self) -> Optional[str]:
+        """ffprobe next to the configured ffmpeg, else on the PATH"""
+        if self.ffmpeg_binary:
+            sibling = os.path.join(os.path.dirname(self.ffmpeg_binary), 'ffprobe')
+            if os.access(sibling, os.X_OK):
+                return sibling
+        return shutil.which('ffprobe')
+
+    def submit(self, audio_path: str, buffer_pool=None):
+        """Queue a file for decoding and return a future"""
+        return self._executor.submit(self._decode, audio_path, buffer_pool)
+
+    def decode(self, audio_path: str, buffer_pool=None, timeout: Optional[float] = None) -> DecodedAudio:
+        """
+        Decode a file on a pool worker and wait for the result. When a
+        ``buffer_pool`` is given, samples are written into a borrowed buffer
+        that the caller must release.
+        """
+        return self.submit(audio_path, buffer_pool).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return decode counts and latency figures"""
+        with self._lock:
+            decoded = self._stats['decoded']
+            return {
+                'workers': self.max_workers,
+                'ffmpeg_available': self.ffmpeg_binary is not None,
+                'decoded': decoded,
+                'failed': self._stats['failed'],
+                'average_decode_ms': round(self._stats['total_decode_ms'] / decoded, 2) if decoded else 0,
+                'last_decode_ms': round(self._stats['last_decode_ms'], 2),
+                'by_container': dict(self._stats['by_container'])
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _decode(self, audio_path: str, buffer_pool=None) -> DecodedAudio:
+        start = time.perf_counter()
+        container = sniff_file(audio_path)
+        buffer = None
+        samples = None
+        try:
+            if container == 'wav':
+                samples, buffer = self._decode_wav_fast(audio_path, buffer_pool)
+
+            if samples is None:
+                if self.ffmpeg_binary and buffer_pool is not None:
+                    buffer = self._decode_with_ffmpeg_into(audio_path, buffer_pool)
+                    samples = buffer.array[:buffer.length]
+                elif self.ffmpeg_binary:
+                    samples = self._decode_with_ffmpeg(audio_path)
+                elif container in SOUNDFILE_CONTAINERS:
+                    samples = self._decode_with_soundfile(audio_path)
+                else:
+                    raise DecodeError(f"Cannot decode '{container}' audio without ffmpeg")
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            raise
+
+        decode_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['decoded'] += 1
+            self._stats['total_decode_ms'] += decode_ms
+            self._stats['last_decode_ms'] = decode_ms
+            self._stats['by_container'][container] = self._stats['by_container'].get(container, 0) + 1
+
+        logger.info(f"Decoded {container} audio ({len(samples) / TARGET_SAMPLE_RATE:.1f}s) in {decode_ms:.1f} ms")
+        return DecodedAudio(samples, container, decode_ms, buffer)
+
+    def _decode_wav_fast(self, audio_path: str, buffer_pool=None) -> tuple:
+        """
+        Fast path for plain PCM WAV: memory-map the data chunk and convert
+        to mono float32 straight into the output buffer. Returns
+        ``(None, None)`` when the file needs the general decoder.
+        """
+        try:
+            wav = open_wav(audio_path)
+        except UnsupportedWavError as e:
+            logger.debug(f"WAV fast path not applicable for {audio_path}: {e}")
+            return None, None
+
+        with wav:
+            if wav.sample_rate != TARGET_SAMPLE_RATE:
+                from scipy.signal import resample_poly
+                divisor = gcd(wav.sample_rate, TARGET_SAMPLE_RATE)
+                mono = wav.to_float32()
+                samples = resample_poly(mono, TARGET_SAMPLE_RATE // divisor, wav.sample_rate // divisor)
+                return samples.astype(np.float32, copy=False), None
+
+            if buffer_pool is None:
+                return wav.to_float32(), None
+
+            buffer = buffer_pool.acquire(wav.frames)
+            try:
+                wav.to_float32(out=buffer.array)
+            except Exception:
+                # e.g. a truncated data chunk; the caller never sees this buffer
+                buffer_pool.release(buffer)
+                raise
+            buffer.length = wav.frames
+            return buffer.array[:buffer.length], buffer
+
+    @contextmanager
+    def _ffmpeg_output(self, audio_path: str):
+        """
+        Run ffmpeg on a file and yield its stdout. stderr goes to a temporary
+        file rather than a pipe, so a flood of warnings can never block ffmpeg
+        while stdout is being read, and a watchdog kills the process after
+        ``ffmpeg_timeout`` seconds.
+        """
+        command = [
+            self.ffmpeg_binary, '-nostdin', '-v', 'error',
+            '-i', audio_path,
+            '-f', 'f32le', '-acodec', 'pcm_f32le',
+            '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE),
+            'pipe:1'
+        ]
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+            timed_out = threading.Event()
+
+            def kill():
+                timed_out.set()
+                process.kill()
+
+            watchdog = threading.Timer(self.ffmpeg_timeout, kill)
+            watchdog.start()
+            try:
+                yield process.stdout
+                process.wait()
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                watchdog.cancel()
+                process.stdout.close()
+
+            if timed_out.is_set():
+                raise DecodeError(f"ffmpeg timed out after {self.ffmpeg_timeout:g}s")
+            if process.returncode != 0:
+                stderr.seek(0)
+                raise DecodeError(f"ffmpeg failed: {stderr.read().decode(errors='ignore').strip()}")
+
+    def _decode_with_ffmpeg(self, audio_path: str) -> np.ndarray:
+        # Stream PCM out of the pipe instead of waiting for the whole file
+        buffer = bytearray()
+        with self._ffmpeg_output(audio_path) as stdout:
+            while True:
+                chunk = stdout.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer.extend(chunk)
+
+        # View the PCM bytes as float32 without another copy
+        return np.frombuffer(buffer, dtype='<f4', count=len(buffer) // 4)
+
+    def _probe_duration(self, audio_path: str) -> Optional[float]:
+        """Container duration in seconds from ffprobe, or None if it is not known"""
+        if not self.ffprobe_binary:
+            return None
+        command = [
+            self.ffprobe_binary, '-v', 'error',
+            '-show_entries', 'format=duration', '-of', 'csv=p=0',
+            audio_path
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=FFPROBE_TIMEOUT)
+            duration = float(result.stdout.decode().strip())
+        except (subprocess.TimeoutExpired, OSError, ValueError):
+            return None
+        return duration if duration > 0 else None
+
+    def _initial_samples(self, audio_path: str) -> int:
+        """Expected decoded length, so the output buffer rarely has to grow"""
+        duration = self._probe_duration(audio_path)
+        if duration is None:
+            return min(os.path.getsize(audio_path), UNPROBED_BUFFER_SAMPLES)
+        # Resampling can add a few samples beyond duration x rate
+        return int(duration * TARGET_SAMPLE_RATE) + TARGET_SAMPLE_RATE // 10
+
+    def _decode_with_ffmpeg_into(self, audio_path: str, buffer_pool):
+        """Stream ffmpeg output directly into a pooled float32 buffer"""
+        # Start from the probed length and double as needed
+        buffer = buffer_pool.acquire(self._initial_samples(audio_path))
+        filled = 0
+        try:
+            with self._ffmpeg_output(audio_path) as stdout:
+                while True:
+                    view = memoryview(buffer.array).cast('B')
+                    if filled == len(view):
+                        larger = buffer_pool.acquire(buffer.capacity * 2)
+                        larger.array[:buffer.capacity] = buffer.array
+                        buffer_pool.release(buffer)
+                        buffer = larger
+                        continue
+                    read = stdout.readinto(view[filled:])
+                    if not read:
+                        break
+                    filled += read
+        except Exception:
+            buffer_pool.release(buffer)
+            raise
+
+        buffer.length = filled // 4
+        return buffer
+
+    def _decode_with_soundfile(self, audio_path: str) -> np.ndarray:
+        import soundfile as sf
+
+        samples, sample_rate = sf.read(audio_path, dtype='float32', always_2d=True)
+        samples = samples.mean(axis=1)
+        if sample_rate != TARGET_SAMPLE_RATE:
+            import librosa
+            samples = librosa.resample(samples, orig_sr=sample_rate, target_sr=TARGET_SAMPLE_RATE)
+        return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_decoder_pool() -> AudioDecoderPool:
+    """Return the shared decoder pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AudioDecoderPool(
+                max_workers=int(os.environ.get('AUDIO_DECODER_WORKERS', 2)),
+                ffmpeg_binary=os.environ.get('FFMPEG_BINARY'),
+                ffmpeg_timeout=float(os.environ.get('FFMPEG_TIMEOUT_SECONDS', DEFAULT_FFMPEG_TIMEOUT))
+            )
+        return _pool
+
+
+def decode_audio(audio_path: str, buffer_pool=None) -> DecodedAudio:
+    """Global function to decode an audio file to 16 kHz mono float32"""
+    return get_decoder_pool().decode(audio_path, buffer_pool)
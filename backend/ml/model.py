@@ -1,4 +1,5 @@
 import os
+import time
 import logging
 import numpy as np
 import torch
@@ -6,11 +7,26 @@ import torchaudio
 from typing import Dict, List, Any
 from transformers import Wav2Vec2Processor, Wav2Vec2ForSequenceClassification
 import torch.nn.functional as F
+from concurrent.futures import ThreadPoolExecutor, wait
+from ml.decoder import decode_audio, get_decoder_pool
+from ml.buffer_pool import get_buffer_pool
+from ml.normalization import Wav2Vec2Normalizer
+from ml.peaks import compute_waveform_peaks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000
+
+# Recordings longer than this are split into segments and inferred in parallel (<= 0 disables)
+SPLIT_THRESHOLD_SECONDS = float(os.environ.get('INFERENCE_SPLIT_SECONDS', 60))
+SEGMENT_SECONDS = float(os.environ.get('INFERENCE_SEGMENT_SECONDS', 20))
+# Each segment's forward pass already runs on torch's intra-op thread pool, so only a few
+# segments run at once and the pool is capped to share the cores between them
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', min(2, os.cpu_count() or 1)))
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', max(1, (os.cpu_count() or 1) // max(1, INFERENCE_WORKERS))))
+
 class StutteringAnalyzer:
     def __init__(self, model_path: str = None):
         """Initialize the stuttering detection model"""
@@ -24,6 +40,9 @@ class StutteringAnalyzer:
             
         self.model = None
         self.processor = None
+        self.normalizer = None
+        self.buffer_pool = get_buffer_pool()
+        self.segment_executor = None
         
         # Try to load the trained model
         self._load_model()
@@ -44,6 +63,9 @@ class StutteringAnalyzer:
                 # Load processor
                 self.processor = Wav2Vec2Processor.from_pretrained(self.model_path)
                 
+                # Native normalization stage using the same preprocessor config
+                self.normalizer = Wav2Vec2Normalizer.from_pretrained(self.model_path)
+                
                 # Load model - Wav2Vec2ForSequenceClassification will auto-detect config from preprocessor
                 self.model = Wav2Vec2ForSequenceClassification.from_pretrained(
                     self.model_path,
@@ -52,6 +74,14 @@ class StutteringAnalyzer:
                 self.model.to(self.device)
                 self.model.eval()
                 
+                if SPLIT_THRESHOLD_SECONDS > 0 and INFERENCE_WORKERS > 1:
+                    # Process-wide: torch has one intra-op pool, so workers x threads stays within the cores
+                    torch.set_num_threads(INFERENCE_THREADS)
+                    self.segment_executor = ThreadPoolExecutor(
+                        max_workers=INFERENCE_WORKERS,
+                        thread_name_prefix='inference-segment'
+                    )
+                
                 logger.info("Trained model loaded successfully!")
             else:
                 logger.warning(f"Trained model files not found in {self.model_path}")
@@ -69,6 +99,7 @@ class StutteringAnalyzer:
         # This would be replaced with actual model loading in production
         self.model = None
         self.processor = None
+        self.normalizer = None
     
     def analyze_audio_file(self, audio_path: str) -> Dict[str, Any]:
         """
@@ -85,14 +116,26 @@ class StutteringAnalyzer:
                 logger.warning("No trained model available, using fallback analysis")
                 return self._generate_fallback_result()
             
-            # Use the trained model for prediction
-            prediction, probability = self._predict_with_model(audio_path)
+            # Decode to 16kHz mono and use the trained model for prediction
+            waveform, decode_ms, buffer = self._load_waveform(audio_path)
+            segments = None
+            try:
+                # Peaks are taken before inference; the buffer may be reused afterwards
+                waveform_peaks = compute_waveform_peaks(waveform.numpy(), SAMPLE_RATE)
+                if self._should_split(waveform):
+                    prediction, probability, segments = self._predict_segmented(waveform)
+                else:
+                    prediction, probability = self._predict_with_model(waveform)
+            finally:
+                self.buffer_pool.release(buffer)
             
             # Determine severity based on probability
             severity = self._determine_severity(probability)
             
             # Generate detailed analysis
             analysis_data = self._generate_detailed_analysis(audio_path, probability)
+            if segments:
+                analysis_data['segments'] = segments
             
             # Generate recommendations
             recommendations = self._generate_recommendations(severity)
@@ -106,41 +149,58 @@ class StutteringAnalyzer:
                 'analysis_data': analysis_data,
                 'recommendations': recommendations,
                 'exercises': exercises,
-                'confidence': self._calculate_confidence(probability, analysis_data)
+                'confidence': self._calculate_confidence(probability, analysis_data),
+                'decode_latency_ms': round(decode_ms, 2),
+                'waveform_peaks': waveform_peaks
             }
             
         except Exception as e:
             logger.error(f"Error in audio analysis: {e}")
             return self._generate_fallback_result()
     
-    def _predict_with_model(self, audio_path: str) -> tuple:
+    def _load_waveform(self, audio_path: str) -> tuple:
+        """
+        Decode audio to a 1D 16kHz mono tensor, preferring the decoder pool.
+        
+        Returns (waveform, decode_ms, buffer) where buffer is the pooled
+        buffer backing the waveform (or None) and must be released by the caller.
+        """
+        start = time.perf_counter()
+        try:
+            decoded = decode_audio(audio_path, self.buffer_pool)
+            return torch.from_numpy(decoded.samples), decoded.decode_ms, decoded.buffer
+        except Exception as e:
+            logger.warning(f"Decoder pool failed for {audio_path}, falling back to torchaudio: {e}")
+
+        # Load audio
+        waveform, sample_rate = torchaudio.load(audio_path)
+        
+        # Resample to 16kHz if needed
+        if sample_rate != 16000:
+            resampler = torchaudio.transforms.Resample(sample_rate, 16000)
+            waveform = resampler(waveform)
+        
+        # Convert to mono if stereo, mixing down into a pooled buffer
+        buffer = None
+        if waveform.shape[0] > 1:
+            buffer = self.buffer_pool.acquire(waveform.shape[1])
+            buffer.length = waveform.shape[1]
+            torch.mean(waveform, dim=0, out=buffer.view())
+            waveform = buffer.view()
+        else:
+            waveform = waveform[0]
+        
+        return waveform, (time.perf_counter() - start) * 1000, buffer
+    
+    def _predict_with_model(self, waveform: torch.Tensor) -> tuple:
         """Make prediction using the trained Wav2Vec2 model"""
         try:
-            # Load audio
-            waveform, sample_rate = torchaudio.load(audio_path)
+            # Normalize in place (the waveform is private to this call) instead
+            # of going through the Wav2Vec2Processor Python path
+            input_values = self.normalizer.normalize_(waveform.unsqueeze(0))
             
-            # Resample to 16kHz if needed
-            if sample_rate != 16000:
-                resampler = torchaudio.transforms.Resample(sample_rate, 16000)
-                waveform = resampler(waveform)
-            
-            # Convert to mono if stereo
-            if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
-            
-            # Flatten to 1D tensor
-            waveform = waveform.squeeze()
-            
-            # Process with Wav2Vec2Processor
-            inputs = self.processor(
-                waveform,
-                sampling_rate=16000,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            # Move to appropriate device
-            input_values = inputs.input_values.to(self.device)
+            # Move to appropriate device; pinned pool buffers copy asynchronously
+            input_values = input_values.to(self.device, non_blocking=True)
             
             # Model inference
             self.model.eval()
@@ -163,6 +223,56 @@ class StutteringAnalyzer:
             logger.error(f"Error in model prediction: {e}")
             raise
     
+    def _should_split(self, waveform: torch.Tensor) -> bool:
+        """Whether a recording is long enough to run as parallel segments"""
+        return (
+            self.segment_executor is not None
+            and waveform.shape[0] > SPLIT_THRESHOLD_SECONDS * SAMPLE_RATE
+        )
+    
+    def _segment_bounds(self, num_samples: int) -> List[tuple]:
+        """Split a recording into fixed-length segments, folding a short tail into the last one"""
+        segment_length = int(SEGMENT_SECONDS * SAMPLE_RATE)
+        bounds = [(start, min(start + segment_length, num_samples))
+                  for start in range(0, num_samples, segment_length)]
+        if len(bounds) > 1 and bounds[-1][1] - bounds[-1][0] < segment_length // 2:
+            tail_end = bounds.pop()[1]
+            bounds[-1] = (bounds[-1][0], tail_end)
+        return bounds
+    
+    def _predict_segmented(self, waveform: torch.Tensor) -> tuple:
+        """
+        Run one long recording as parallel segments across the inference
+        workers and merge them into a duration-weighted probability.
+        
+        Segments are non-overlapping views of the waveform, so each worker
+        can normalize its own segment in place.
+        """
+        bounds = self._segment_bounds(waveform.shape[0])
+        futures = [
+            self.segment_executor.submit(self._predict_with_model, waveform[start:end])
+            for start, end in bounds
+        ]
+        # Every segment writes into the caller's (pooled) buffer, so none may still be
+        # running when a failure reaches the caller and the buffer is released
+        wait(futures)
+        
+        segments = []
+        weighted_sum = 0.0
+        for (start, end), future in zip(bounds, futures):
+            _, segment_probability = future.result()
+            weighted_sum += segment_probability * (end - start)
+            segments.append({
+                'start_seconds': round(start / SAMPLE_RATE, 2),
+                'end_seconds': round(end / SAMPLE_RATE, 2),
+                'stutter_probability': segment_probability
+            })
+        
+        probability = weighted_sum / waveform.shape[0]
+        prediction = 1 if probability > 0.5 else 0
+        logger.info(f"Merged {len(segments)} parallel segments into probability {probability:.3f}")
+        return prediction, probability, segments
+    
     def analyze_audio_features(self, audio_features: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze audio features (fallback method when model is not available)
@@ -418,4 +528,11 @@ def analyze_audio(audio_features: Dict[str, Any]) -> Dict[str, Any]:
 
 def analyze_audio_file(audio_path: str) -> Dict[str, Any]:
     """Global function to analyze audio file"""
-    return analyzer.analyze_audio_file(audio_path)
\ No newline at end of file
+    return analyzer.analyze_audio_file(audio_path)
+
+def get_pipeline_stats() -> Dict[str, Any]:
+    """Global function to report decoder latency and buffer pool allocation counts"""
+    return {
+        'decoder': get_decoder_pool().stats(),
+        'buffer_pool': analyzer.buffer_pool.stats()
+    }
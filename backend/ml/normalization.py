@@ -0,0 +1,92 @@
+import os
+import json
+import logging
+from typing import List, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Same epsilon as Wav2Vec2FeatureExtractor.zero_mean_unit_var_norm
+VARIANCE_EPSILON = 1e-7
+
+
+class Wav2Vec2Normalizer:
+    """
+    Native torch replacement for the Wav2Vec2FeatureExtractor input path.
+
+    Reads ``do_normalize``, ``padding_value``, ``sampling_rate`` and
+    ``return_attention_mask`` from ``preprocessor_config.json`` and applies
+    per-sequence zero-mean / unit-variance normalization to a whole padded
+    batch in place, skipping the processor's list conversions.
+    """
+
+    def __init__(self, do_normalize: bool = True, padding_value: float = 0.0,
+                 sampling_rate: int = 16000, return_attention_mask: bool = False):
+        self.do_normalize = do_normalize
+        self.padding_value = padding_value
+        self.sampling_rate = sampling_rate
+        self.return_attention_mask = return_attention_mask
+
+    @classmethod
+    def from_pretrained(cls, model_path: str) -> 'Wav2Vec2Normalizer':
+        """Build a normalizer from the model's preprocessor_config.json"""
+        with open(os.path.join(model_path, 'preprocessor_config.json')) as f:
+            config = json.load(f)
+        return cls(
+            do_normalize=config.get('do_normalize', True),
+            padding_value=config.get('padding_value', 0.0),
+            sampling_rate=config.get('sampling_rate', 16000),
+            return_attention_mask=config.get('return_attention_mask', False)
+        )
+
+    def pad(self, waveforms: List[torch.Tensor], out: Optional[torch.Tensor] = None) -> tuple:
+        """
+        Stack 1D waveforms into a ``(batch, max_length)`` tensor, writing into
+        ``out`` (e.g. a pooled buffer) when given. Returns (batch, lengths).
+        """
+        lengths = torch.tensor([w.shape[0] for w in waveforms], dtype=torch.long)
+        max_length = int(lengths.max())
+        if out is None:
+            batch = torch.empty(len(waveforms), max_length, dtype=torch.float32)
+        else:
+            batch = out[:len(waveforms) * max_length].view(len(waveforms), max_length)
+
+        for row, waveform in zip(batch, waveforms):
+            row[:waveform.shape[0]].copy_(waveform)
+            row[waveform.shape[0]:].fill_(self.padding_value)
+        return batch, lengths
+
+    def normalize_(self, batch: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Normalize a ``(batch, time)`` tensor in place. Statistics are taken
+        over each row's first ``lengths[i]`` samples and padded positions are
+        reset to ``padding_value``, as the feature extractor does when given
+        an attention mask.
+        """
+        if not self.do_normalize:
+            return batch
+
+        if lengths is None:
+            mean = batch.mean(dim=1, keepdim=True)
+            batch.sub_(mean)
+            variance = batch.square().mean(dim=1, keepdim=True)
+            return batch.div_(torch.sqrt(variance + VARIANCE_EPSILON))
+
+        lengths = lengths.to(batch.device)
+        padding = torch.arange(batch.shape[1], device=batch.device)[None, :] >= lengths[:, None]
+        counts = lengths.to(batch.dtype)[:, None]
+
+        batch.masked_fill_(padding, 0.0)
+        batch.sub_(batch.sum(dim=1, keepdim=True) / counts)
+        batch.masked_fill_(padding, 0.0)
+        variance = torch.linalg.vector_norm(batch, dim=1, keepdim=True).square_() / counts
+        batch.div_(torch.sqrt(variance + VARIANCE_EPSILON))
+        return batch.masked_fill_(padding, self.padding_value)
+
+    def attention_mask(self, batch: torch.Tensor, lengths: torch.Tensor) -> Optional[torch.Tensor]:
+        """Attention mask for the model, or None if the model was trained without one"""
+        if not self.return_attention_mask:
+            return None
+        positions = torch.arange(batch.shape[1], device=batch.device)[None, :]
+        return (positions < lengths.to(batch.device)[:, None]).long()
@@ -0,0 +1,81 @@
+import struct
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Finest level of the pyramid; each coarser level halves the bin count
+PEAK_BINS = 1024
+MIN_LEVEL_BINS = 16
+
+PEAKS_MAGIC = b'WPK1'
+# magic, level count, finest bin count, sample rate, samples covered
+PEAKS_HEADER = struct.Struct('<4sHHII')
+
+
+def build_peak_pyramid(samples: np.ndarray, bins: int = PEAK_BINS) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reduce a mono float waveform to per-bin (min, max) arrays, finest level
+    first, down to MIN_LEVEL_BINS bins. Coarser levels are built from the
+    level below, so the waveform is only scanned once.
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if samples.size == 0:
+        return []
+
+    # Power of two so every coarser level pairs up exactly
+    bins = min(bins, 1 << (int(samples.size).bit_length() - 1))
+    starts = (np.arange(bins, dtype=np.int64) * samples.size) // bins
+    mins = np.minimum.reduceat(samples, starts)
+    maxs = np.maximum.reduceat(samples, starts)
+
+    levels = [(mins, maxs)]
+    while mins.size > MIN_LEVEL_BINS:
+        mins = np.minimum(mins[0::2], mins[1::2])
+        maxs = np.maximum(maxs[0::2], maxs[1::2])
+        levels.append((mins, maxs))
+    return levels
+
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(values * 127.0), -127, 127).astype(np.int8)
+
+
+def encode_peaks(levels: List[Tuple[np.ndarray, np.ndarray]], sample_rate: int, num_samples: int) -> bytes:
+    """
+    Pack a pyramid into a compact blob: header, then for each level (finest
+    first) interleaved int8 min/max pairs. 1024 bins come to about 4 KB.
+    """
+    finest = levels[0][0].size if levels else 0
+    parts = [PEAKS_HEADER.pack(PEAKS_MAGIC, len(levels), finest, sample_rate, num_samples)]
+    for mins, maxs in levels:
+        interleaved = np.empty(mins.size * 2, dtype=np.int8)
+        interleaved[0::2] = _quantize(mins)
+        interleaved[1::2] = _quantize(maxs)
+        parts.append(interleaved.tobytes())
+    return b''.join(parts)
+
+
+def decode_peaks(blob: bytes) -> dict:
+    """Unpack a blob from encode_peaks into per-level int8 min/max arrays"""
+    magic, level_count, finest, sample_rate, num_samples = PEAKS_HEADER.unpack_from(blob)
+    if magic != PEAKS_MAGIC:
+        raise ValueError("Not a waveform peaks blob")
+
+    levels = []
+    offset = PEAKS_HEADER.size
+    bins = finest
+    for _ in range(level_count):
+        interleaved = np.frombuffer(blob, dtype=np.int8, count=bins * 2, offset=offset)
+        levels.append((interleaved[0::2], interleaved[1::2]))
+        offset += bins * 2
+        bins //= 2
+    return {'sample_rate': sample_rate, 'num_samples': num_samples, 'levels': levels}
+
+
+def compute_waveform_peaks(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Build and encode the peak pyramid for a decoded waveform"""
+    samples = np.asarray(samples).reshape(-1)
+    return encode_peaks(build_peak_pyramid(samples), sample_rate, int(samples.size))
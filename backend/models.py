@@ -51,19 +51,133 @@ class Progress(db.Model):
     notes = db.Column(db.Text)
     fluency_rating = db.Column(db.Integer)  # 1-10 scale
     confidence_rating = db.Column(db.Integer)  # 1-10 scale
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Stamped in Python, so insert hooks can read it once the row is flushed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # date is the practice day in the user's timezone; streak repairs walk this index
+        db.Index('ix_progress_user_date', 'user_id', 'date'),
+        # Per-exercise effectiveness: WHERE user_id = ? partitioned by exercise_id, ordered by created_at
+        db.Index('ix_progress_user_exercise_created', 'user_id', 'exercise_id', 'created_at'),
+    )
+
+class PracticeStreak(db.Model):
+    """Per-user practice streak, kept current by practice_streaks.py"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # run of days ending at last_practice_date
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_practice_date = db.Column(db.Date)  # in the user's timezone
 
 class AnalysisResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    audio_file_path = db.Column(db.String(256))
+    audio_sha256 = db.Column(db.String(64), index=True)  # key of the recording in the audio store
     severity = db.Column(db.String(32))  # none, mild, moderate, severe
     score = db.Column(db.Integer)
     confidence = db.Column(db.Float)
     stutter_count = db.Column(db.Integer)
     word_count = db.Column(db.Integer)
-    analysis_data = db.Column(db.JSON)  # detailed analysis results
+    # Stamped in Python so SQLite stores microseconds, in the same format as history cursors compare against
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Large columns last, so scans of the narrow ones never step over them
+    waveform_peaks = db.deferred(db.Column(db.LargeBinary))  # packed min/max peak pyramid, see ml/peaks.py
+    # Detailed results live in analysis_detail and load only when analysis_data is read
+    detail = db.relationship('AnalysisDetail', uselist=False, lazy='select', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Keyset pagination of a user's history: WHERE user_id = ? AND (created_at, id) < (?, ?)
+        db.Index('ix_analysis_result_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+
+    @property
+    def analysis_data(self):
+        return self.detail.analysis_data if self.detail else None
+
+    @analysis_data.setter
+    def analysis_data(self, value):
+        if self.detail is None:
+            self.detail = AnalysisDetail(analysis_data=value)
+        else:
+            self.detail.analysis_data = value
+
+class AnalysisDetail(db.Model):
+    """Full analysis payload (details, recommendations, exercises), one row per AnalysisResult"""
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis_result.id', ondelete='CASCADE'), primary_key=True)
+    analysis_data = db.Column(db.JSON)
+
+class AnalysisStats(db.Model):
+    """Per-user running totals over AnalysisResult, kept current by analysis_stats.py"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_analyses = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)  # analyses with a score
+    severity_counts = db.Column(db.JSON, default=dict)  # severity -> count
+    recent_analyses = db.Column(db.JSON, default=list)  # newest first, at most RECENT_ANALYSES entries
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class DailyRollup(db.Model):
+    """Per-user, per-day totals over Progress and AnalysisResult, kept current by analytics_rollups.py"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)  # Progress rows
+    score_count = db.Column(db.Integer, nullable=False, default=0)  # sessions with a score
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_sq_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    score_min = db.Column(db.Integer)
+    score_max = db.Column(db.Integer)
+    score_histogram = db.Column(db.JSON, default=dict)  # score -> count, for exact quartiles
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)  # in seconds
+    analyses = db.Column(db.Integer, nullable=False, default=0)  # AnalysisResult rows
+    analyses_none = db.Column(db.Integer, nullable=False, default=0)
+    analyses_mild = db.Column(db.Integer, nullable=False, default=0)
+    analyses_moderate = db.Column(db.Integer, nullable=False, default=0)
+    analyses_severe = db.Column(db.Integer, nullable=False, default=0)
+
+class DashboardSnapshot(db.Model):
+    """The dashboard for one standard window of one user, kept current by dashboard_snapshots.py"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    days = db.Column(db.Integer, primary_key=True)  # window length, one of DASHBOARD_SNAPSHOT_WINDOWS
+    anchor_day = db.Column(db.Date, nullable=False)  # the window covers the `days` days before this one, to now
+    data = db.Column(db.JSON, nullable=False)
+    changes = db.Column(db.Integer, nullable=False, default=0)  # bumped by each insert of the user's rows
+    built_from = db.Column(db.Integer, nullable=False, default=0)  # the `changes` value `data` was built at
+    updated_at = db.Column(db.DateTime)
+
+class ReportSnapshot(db.Model):
+    """A generated detailed analytics report, one row per generation, see report_jobs.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # per user, increasing
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, ready, failed
+    source_marker = db.Column(db.String(64))  # '<count>:<max id>' of the user's Progress rows it was built from
+    data = db.deferred(db.Column(db.JSON))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    completed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'version', name='uq_report_snapshot_user_version'),
+    )
+
+class PopulationBenchmark(db.Model):
+    """Quantile sketch of one per-user metric across all users, rebuilt by population_benchmarks.py"""
+    metric = db.Column(db.String(32), primary_key=True)  # average_score, session_count, improvement_rate
+    sketch = db.Column(db.LargeBinary, nullable=False)  # see quantile_sketch.py
+    population = db.Column(db.Integer, nullable=False, default=0)  # users in the sketch
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class UploadSession(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(256))
+    total_size = db.Column(db.Integer, nullable=False)  # in bytes
+    received_size = db.Column(db.Integer, default=0)  # bytes written so far
+    expected_sha256 = db.Column(db.String(64))  # optional digest supplied by the client
+    status = db.Column(db.String(16), default='open')  # open, finalizing, finalized
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis_result.id'))
+    expires_at = db.Column(db.DateTime)  # unfinished uploads are removed after this, see upload_expiry.py
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
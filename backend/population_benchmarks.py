@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Population benchmarks for the comparative analysis
+
+A periodic job sketches three per-user metrics across all users: average
+score, session count and improvement rate (second-half over first-half
+mean, as in the detailed report). Users are read in chunks, each chunk is
+sketched, and the chunk sketches are merged, so memory stays bounded. One
+compact sketch per metric is stored in PopulationBenchmark. Requests then
+read percentiles from the decoded sketches held in memory, without
+touching other users' rows.
+
+Usage: python population_benchmarks.py   rebuild the sketches now
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import case, func
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import Config
+from db import db
+from models import Progress, PopulationBenchmark
+from quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('average_score', 'session_count', 'improvement_rate')
+
+# Users per chunk when building sketches
+USER_CHUNK = 10000
+
+_sketches = {}
+_loaded_at = None
+_sketches_lock = threading.Lock()
+
+
+def _user_session_counts():
+    return db.session.query(func.count(Progress.id))\
+        .filter(Progress.user_id.isnot(None), Progress.created_at.isnot(None))\
+        .group_by(Progress.user_id).yield_per(USER_CHUNK)
+
+
+def _user_score_summaries():
+    """(average, scored sessions, first-half mean, second-half mean) per user, in one pass"""
+    scored = db.session.query(
+        Progress.user_id,
+        Progress.score,
+        func.row_number().over(
+            partition_by=Progress.user_id, order_by=(Progress.created_at, Progress.id)
+        ).label('position'),
+        func.count().over(partition_by=Progress.user_id).label('total')
+    ).filter(
+        Progress.user_id.isnot(None), Progress.created_at.isnot(None), Progress.score.isnot(None)
+    ).subquery()
+
+    first_half = scored.c.position <= scored.c.total // 2
+    return db.session.query(
+        func.avg(scored.c.score),
+        func.count(),
+        func.avg(case((first_half, scored.c.score))),
+        func.avg(case((~first_half, scored.c.score)))
+    ).group_by(scored.c.user_id).yield_per(USER_CHUNK)
+
+
+def _sketch_in_chunks(rows, to_values):
+    sketch = QuantileSketch()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == USER_CHUNK:
+            sketch = sketch.merge(QuantileSketch.from_values(to_values(chunk)))
+            chunk = []
+    if chunk:
+        sketch = sketch.merge(QuantileSketch.from_values(to_values(chunk)))
+    return sketch
+
+
+def _improvement_rates(chunk):
+    # Users need two scored sessions before they have an improvement rate
+    halves = np.array([(first, second) for _, count, first, second in chunk if count >= 2],
+                      dtype=np.float64).reshape(-1, 2)
+    first, second = halves[:, 0], halves[:, 1]
+    return np.divide((second - first) * 100, first, out=np.zeros_like(first), where=first > 0)
+
+
+def rebuild_benchmarks():
+    """Recompute every sketch from Progress. Returns {metric: population}."""
+    sketches = {
+        'session_count': _sketch_in_chunks(
+            _user_session_counts(), lambda chunk: np.array([count for (count,) in chunk], dtype=np.float64)
+        ),
+        'average_score': _sketch_in_chunks(
+            _user_score_summaries(), lambda chunk: np.array([float(row[0]) for row in chunk], dtype=np.float64)
+        ),
+        'improvement_rate': _sketch_in_chunks(_user_score_summaries(), _improvement_rates)
+    }
+
+    for metric, sketch in sketches.items():
+        benchmark = db.session.get(PopulationBenchmark, metric) or PopulationBenchmark(metric=metric)
+        benchmark.sketch = sketch.encode()
+        benchmark.population = sketch.count
+        benchmark.updated_at = datetime.utcnow()
+        db.session.add(benchmark)
+    db.session.commit()
+
+    global _loaded_at
+    with _sketches_lock:
+        _sketches.update(sketches)
+        _loaded_at = time.monotonic()
+    return {metric: sketch.count for metric, sketch in sketches.items()}
+
+
+def get_sketch(metric):
+    """Decoded sketch for a metric, reread from the database every BENCHMARK_RELOAD_SECONDS"""
+    global _loaded_at
+    with _sketches_lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at > Config.BENCHMARK_RELOAD_SECONDS:
+            _sketches.clear()
+            for benchmark in PopulationBenchmark.query.all():
+                _sketches[benchmark.metric] = QuantileSketch.decode(benchmark.sketch)
+            _loaded_at = time.monotonic()
+        sketch = _sketches.get(metric)
+    return sketch if sketch is not None and sketch.count else None
+
+
+def compare(metric, value):
+    """(population median, percentile of value) for a metric; (None, None) until sketches exist"""
+    sketch = get_sketch(metric)
+    if sketch is None:
+        return None, None
+    return sketch.quantile(0.5), sketch.percentile(value)
+
+
+def start_benchmark_worker(app, interval_seconds=None):
+    """Rebuild the sketches now and then periodically, on a daemon thread"""
+    interval_seconds = interval_seconds or Config.BENCHMARK_INTERVAL_SECONDS
+    if interval_seconds <= 0:
+        return None
+
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    rebuild_benchmarks()
+            except Exception as e:
+                logger.error(f"Benchmark rebuild failed: {e}")
+            time.sleep(interval_seconds)
+
+    worker = threading.Thread(target=run, name='population-benchmarks', daemon=True)
+    worker.start()
+    return worker
+
+
+def main():
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Rebuilding population benchmarks...")
+        populations = rebuild_benchmarks()
+        for metric in METRICS:
+            sketch = get_sketch(metric)
+            median = f"{sketch.quantile(0.5):.1f}" if sketch else '-'
+            print(f"✅ {metric}: {populations[metric]} users, median {median}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Practice streaks, maintained incrementally
+
+Progress.date is the practice day in the user's timezone (the ``timezone``
+setting, an IANA name). Every flush that inserts Progress rows advances the
+owner's PracticeStreak row on the same connection, so reading a streak is a
+primary-key lookup however long the history is. A backdated session that
+lands before the last practice day is repaired from the (user_id, date)
+index.
+
+Usage: python practice_streaks.py [user_id ...]   rebuild from Progress
+"""
+
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import event, select, insert, update
+from sqlalchemy.orm import Session
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import Config
+from db import db
+from flush_hooks import after_insert
+from models import Progress, PracticeStreak, User
+
+logger = logging.getLogger(__name__)
+
+
+def user_timezone(user):
+    name = (user.get_preferences().get('timezone') if user else None) or Config.DEFAULT_TIMEZONE
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r}, using UTC")
+        return timezone.utc
+
+
+def local_date(user, moment=None):
+    """Calendar date of ``moment`` (a naive UTC datetime, default now) in the user's timezone"""
+    moment = (moment or datetime.utcnow()).replace(tzinfo=timezone.utc)
+    return moment.astimezone(user_timezone(user)).date()
+
+
+def _advance(streak, day):
+    """Apply one practice day at or after the last one; returns (current, longest, last)"""
+    current, longest, last = streak
+    if last is None or day > last + timedelta(days=1):
+        current = 1
+    elif day == last + timedelta(days=1):
+        current += 1
+    return current, max(longest, current), max(day, last) if last else day
+
+
+def _streaks_from_dates(dates):
+    """(current, longest, last) from a user's ascending distinct practice dates"""
+    streak = (0, 0, None)
+    for day in dates:
+        streak = _advance(streak, day)
+    return streak
+
+
+@event.listens_for(Session, 'before_flush')
+def _date_new_progress(session, flush_context, instances):
+    # Streaks are counted in practice days, so every row needs one
+    for obj in session.new:
+        if isinstance(obj, Progress) and obj.date is None and obj.user_id is not None:
+            obj.date = local_date(session.get(User, int(obj.user_id)), obj.created_at)
+
+
+@after_insert(Progress)
+def _update_streaks_on_insert(connection, sessions):
+    practiced = {}
+    for progress in sessions:
+        if progress.date is not None:
+            practiced.setdefault(int(progress.user_id), set()).add(progress.date)
+
+    table = PracticeStreak.__table__
+    for user_id, days in practiced.items():
+        row = connection.execute(
+            select(table).where(table.c.user_id == user_id).with_for_update()
+        ).mappings().first()
+        last = row['last_practice_date'] if row else None
+
+        if last is not None and min(days) < last:
+            # Backdated session: recompute from the date index, which already holds this flush's rows
+            dates = connection.execute(
+                select(Progress.date).where(Progress.user_id == user_id, Progress.date.isnot(None))
+                .distinct().order_by(Progress.date)
+            ).scalars().all()
+            current, longest, last = _streaks_from_dates(dates)
+        else:
+            streak = (row['current_streak'], row['longest_streak'], last) if row else (0, 0, None)
+            for day in sorted(days):
+                streak = _advance(streak, day)
+            current, longest, last = streak
+
+        values = {'current_streak': current, 'longest_streak': longest, 'last_practice_date': last}
+        if row is None:
+            connection.execute(insert(table).values(user_id=user_id, **values))
+        else:
+            connection.execute(update(table).where(table.c.user_id == user_id).values(**values))
+
+
+def get_streaks(user_id):
+    """
+    Current and longest streak for a user. The current streak still counts
+    if the user has not practiced yet today, and lapses after a missed day.
+    """
+    streak = db.session.get(PracticeStreak, int(user_id))
+    if not streak or streak.last_practice_date is None:
+        return {'current_streak': 0, 'longest_streak': 0, 'last_practice_date': None}
+
+    today = local_date(db.session.get(User, int(user_id)))
+    current = streak.current_streak if streak.last_practice_date >= today - timedelta(days=1) else 0
+    return {
+        'current_streak': current,
+        'longest_streak': streak.longest_streak,
+        'last_practice_date': streak.last_practice_date.isoformat()
+    }
+
+
+def rebuild_streaks(user_ids=None):
+    """Recompute streaks from Progress, for backfill or repair. Returns users rebuilt."""
+    if not user_ids:
+        user_ids = [user_id for (user_id,) in db.session.query(Progress.user_id)
+                    .filter(Progress.user_id.isnot(None)).distinct()]
+
+    for user_id in user_ids:
+        user_id = int(user_id)
+        dates = [day for (day,) in db.session.query(Progress.date)
+                 .filter(Progress.user_id == user_id, Progress.date.isnot(None))
+                 .distinct().order_by(Progress.date)]
+        current, longest, last = _streaks_from_dates(dates)
+
+        streak = db.session.get(PracticeStreak, user_id) or PracticeStreak(user_id=user_id)
+        streak.current_streak = current
+        streak.longest_streak = longest
+        streak.last_practice_date = last
+        db.session.add(streak)
+
+    db.session.commit()
+    return len(user_ids)
+
+
+def main():
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Rebuilding practice streaks...")
+        rebuilt = rebuild_streaks([int(arg) for arg in sys.argv[1:]])
+        print(f"✅ Rebuilt streaks for {rebuilt} users")
+
+
+if __name__ == '__main__':
+    main()
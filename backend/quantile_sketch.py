@@ -0,0 +1,113 @@
+"""
+Mergeable quantile sketch (a t-digest with the k1 scale function)
+
+Values are summarized as weighted centroids that are small near the tails
+and larger around the median, so percentiles stay accurate at both ends.
+Two sketches merge by pooling their centroids and compressing again,
+which lets a population be sketched in chunks. A sketch with compression
+200 has at most about 100 centroids and encodes to about 1 KB.
+"""
+
+import struct
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 200
+
+SKETCH_MAGIC = b'QSK1'
+# magic, compression, centroid count, min, max
+SKETCH_HEADER = struct.Struct('<4sHIdd')
+
+
+def _compress(means: np.ndarray, weights: np.ndarray, compression: int):
+    """Merge sorted-order neighbours whose quantile ranges fall in the same unit of k"""
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    cumulative = np.cumsum(weights)
+    q_mid = (cumulative - weights / 2) / cumulative[-1]
+
+    # k1 scale: k(q) = compression / 2pi * asin(2q - 1), spanning [-compression/4, compression/4]
+    k = compression / (2 * np.pi) * np.arcsin(np.clip(2 * q_mid - 1, -1, 1))
+    clusters = np.floor(k + compression / 4).astype(np.int64)
+
+    # Centroids at the same value collapse too, so ties rank as one point
+    _, clusters = np.unique(clusters, return_inverse=True)
+    merged_weights = np.bincount(clusters, weights=weights)
+    merged_means = np.bincount(clusters, weights=means * weights) / merged_weights
+    merged_means, ties = np.unique(merged_means, return_inverse=True)
+    return merged_means, np.bincount(ties, weights=merged_weights)
+
+
+class QuantileSketch:
+    def __init__(self, means=None, weights=None, minimum=0.0, maximum=0.0, compression=DEFAULT_COMPRESSION):
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.compression = compression
+        self._interpolation = None
+
+    @classmethod
+    def from_values(cls, values, compression: int = DEFAULT_COMPRESSION) -> 'QuantileSketch':
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return cls(compression=compression)
+        means, weights = _compress(values, np.ones_like(values), compression)
+        return cls(means, weights, float(values.min()), float(values.max()), compression)
+
+    @property
+    def count(self) -> int:
+        return int(round(self.weights.sum()))
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        means, weights = _compress(
+            np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]),
+            self.compression
+        )
+        return QuantileSketch(means, weights, min(self.minimum, other.minimum),
+                              max(self.maximum, other.maximum), self.compression)
+
+    def _curve(self):
+        """(values, cumulative weights, total weight) to interpolate along, from the minimum to the maximum"""
+        if self._interpolation is None:
+            total = float(self.weights.sum())
+            values, ranks = self.means, np.cumsum(self.weights) - self.weights / 2
+            if self.minimum < values[0]:
+                values, ranks = np.concatenate([[self.minimum], values]), np.concatenate([[0.0], ranks])
+            if self.maximum > values[-1]:
+                values, ranks = np.concatenate([values, [self.maximum]]), np.concatenate([ranks, [total]])
+            self._interpolation = (values, ranks, total)
+        return self._interpolation
+
+    def percentile(self, value: float) -> float:
+        """Percentage of the population below ``value``, ties counting half"""
+        if not self.count:
+            return None
+        values, ranks, total = self._curve()
+        return float(np.interp(value, values, ranks, left=0.0, right=total) / total * 100)
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile ``q`` (0-1)"""
+        if not self.count:
+            return None
+        values, ranks, total = self._curve()
+        return float(np.interp(q * total, ranks, values))
+
+    def encode(self) -> bytes:
+        """Header, then float64 centroid means and float32 weights"""
+        header = SKETCH_HEADER.pack(SKETCH_MAGIC, self.compression, self.means.size, self.minimum, self.maximum)
+        return header + self.means.astype('<f8').tobytes() + self.weights.astype('<f4').tobytes()
+
+    @classmethod
+    def decode(cls, blob: bytes) -> 'QuantileSketch':
+        magic, compression, size, minimum, maximum = SKETCH_HEADER.unpack_from(blob)
+        if magic != SKETCH_MAGIC:
+            raise ValueError('Not a quantile sketch')
+        means = np.frombuffer(blob, dtype='<f8', count=size, offset=SKETCH_HEADER.size)
+        weights = np.frombuffer(blob, dtype='<f4', count=size, offset=SKETCH_HEADER.size + 8 * size)
+        return cls(means, weights, minimum, maximum, compression)
@@ -0,0 +1,153 @@
+"""
+Background generation of detailed analytics reports
+
+Each generation is a ReportSnapshot row with a per-user version number. A
+job runs on a small thread pool, reports each finished section to the
+user's Socket.IO room (``report_progress``, then ``report_ready`` or
+``report_failed``) and stores the finished report on the row. Readers
+serve the newest ready snapshot straight away and ask for a new one only
+when the user's Progress rows have changed since it was built, or it is
+older than REPORT_SNAPSHOT_MAX_AGE_SECONDS.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from db import db
+from models import Progress, ReportSnapshot
+from websocket_events import socketio
+
+logger = logging.getLogger(__name__)
+
+# Ready snapshots kept per user; older ones are deleted when a new one lands
+SNAPSHOTS_KEPT = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_report_executor():
+    """Thread pool that report jobs run on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.REPORT_WORKERS, thread_name_prefix='report')
+        return _executor
+
+
+def _emit(user_id, event, payload):
+    try:
+        socketio.emit(event, payload, room=f"user_{user_id}")
+    except Exception as e:
+        # No Socket.IO server attached (e.g. scripts); clients can still poll the endpoint
+        logger.debug(f"Could not emit {event}: {e}")
+
+
+def source_marker(user_id):
+    """Changes whenever the user's Progress rows are added or removed"""
+    count, last_id = db.session.query(db.func.count(Progress.id), db.func.max(Progress.id))\
+        .filter(Progress.user_id == user_id).one()
+    return f'{count}:{last_id or 0}'
+
+
+def latest_snapshot(user_id):
+    return ReportSnapshot.query.filter_by(user_id=int(user_id), status='ready')\
+        .order_by(ReportSnapshot.version.desc()).first()
+
+
+def in_flight_job(user_id):
+    """The pending or running job for a user, ignoring jobs that have outlived the timeout"""
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.REPORT_JOB_TIMEOUT_SECONDS)
+    return ReportSnapshot.query.filter(
+        ReportSnapshot.user_id == int(user_id),
+        ReportSnapshot.status.in_(('pending', 'running')),
+        ReportSnapshot.created_at >= cutoff
+    ).order_by(ReportSnapshot.version.desc()).first()
+
+
+def is_stale(snapshot):
+    age = datetime.utcnow() - snapshot.completed_at
+    return age > timedelta(seconds=Config.REPORT_SNAPSHOT_MAX_AGE_SECONDS) \
+        or snapshot.source_marker != source_marker(snapshot.user_id)
+
+
+def request_report(user_id, compute):
+    """
+    Start generating a new snapshot with ``compute(user_id, on_step)``, unless
+    one is already under way. Returns the pending or running snapshot row, or
+    None when a concurrent request started a job that has already finished.
+    """
+    user_id = int(user_id)
+    job = in_flight_job(user_id)
+    if job is not None:
+        return job
+
+    latest_version = db.session.query(db.func.max(ReportSnapshot.version))\
+        .filter(ReportSnapshot.user_id == user_id).scalar() or 0
+    job = ReportSnapshot(user_id=user_id, version=latest_version + 1, status='pending',
+                         created_at=datetime.utcnow())
+    try:
+        db.session.add(job)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request claimed this version first; follow its job
+        db.session.rollback()
+        return in_flight_job(user_id)
+
+    get_report_executor().submit(_run_report, current_app._get_current_object(), job.id, compute)
+    return job
+
+
+def _run_report(app, job_id, compute):
+    with app.app_context():
+        job = db.session.get(ReportSnapshot, job_id)
+        user_id, version = job.user_id, job.version
+        try:
+            job.status = 'running'
+            # Taken before reading any data, so rows written during the job mark it stale
+            job.source_marker = source_marker(user_id)
+            db.session.commit()
+
+            def on_step(section, completed, total):
+                _emit(user_id, 'report_progress', {
+                    'version': version, 'section': section, 'completed': completed, 'total': total
+                })
+
+            job.data = compute(user_id, on_step)
+            job.status = 'ready'
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+
+            _prune_snapshots(user_id)
+            _emit(user_id, 'report_ready', {'version': version})
+        except Exception as e:
+            logger.exception(f"Report job {job_id} failed")
+            db.session.rollback()
+            job = db.session.get(ReportSnapshot, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+            _emit(user_id, 'report_failed', {'version': version, 'error': str(e)})
+        finally:
+            db.session.remove()
+
+
+def _prune_snapshots(user_id):
+    keep = [version for (version,) in db.session.query(ReportSnapshot.version)
+            .filter_by(user_id=user_id, status='ready')
+            .order_by(ReportSnapshot.version.desc()).limit(SNAPSHOTS_KEPT)]
+    if len(keep) < SNAPSHOTS_KEPT:
+        return
+    ReportSnapshot.query.filter(
+        ReportSnapshot.user_id == user_id,
+        ReportSnapshot.status.in_(('ready', 'failed')),
+        ReportSnapshot.version < min(keep)
+    ).delete(synchronize_session=False)
+    db.session.commit()
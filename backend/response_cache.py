@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+
+class CachedResponse:
+    def __init__(self, body, etag):
+        self.body = body  # serialized response bytes
+        self.etag = etag  # strong ETag: SHA-256 of the body
+
+
+class ResponseCache:
+    """
+    In-process LRU of serialized responses for resources that never change
+    once written, keyed by ``(user_id, resource_id)``. Bounded by the total
+    size of the cached bodies.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = CachedResponse(body, hashlib.sha256(body).hexdigest())
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+        return entry
+
+    def invalidate_user(self, user_id):
+        """Drop every entry belonging to a user, e.g. when the account is deleted"""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                self._size -= len(self._entries.pop(key).body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+results_cache = ResponseCache(max_bytes=Config.RESULTS_CACHE_MAX_BYTES)
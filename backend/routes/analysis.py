@@ -1,11 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import AnalysisResult, User
+from models import AnalysisResult
 from db import db
+from idempotency import idempotent
+from audio_store import get_audio_store
+from analysis_stats import get_user_stats, average_score
+from config import Config
+from response_cache import results_cache
+from analytics_cache import get_analytics_cache
 import os
+import base64
 import tempfile
-from werkzeug.utils import secure_filename
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
+from ml.decoder import sniff_container, decode_audio, CONTAINER_EXTENSIONS
+from ml.peaks import compute_waveform_peaks, decode_peaks
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +24,7 @@ analysis_bp = Blueprint('analysis', __name__)
 
 # Import ML model with error handling
 try:
-    from ml.model import analyze_audio_file, analyze_audio
+    from ml.model import analyze_audio_file, analyze_audio, get_pipeline_stats
     ML_MODEL_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"ML model not available: {e}")
@@ -38,14 +49,143 @@ except ImportError as e:
             'exercises': [],
             'confidence': 0.3
         }
+    
+    def get_pipeline_stats():
+        return {}
+
+ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'flac', 'ogg', 'webm'}
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Results and peaks never change once written (re-analysis creates a new result)
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_batch_executor():
+    """Thread pool that batch uploads fan their recordings out to"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=Config.BATCH_ANALYSIS_WORKERS, thread_name_prefix='batch-analysis'
+            )
+        return _batch_executor
 
-ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'flac', 'ogg'}
+def encode_history_cursor(analysis):
+    """Opaque cursor pointing just past an analysis in (created_at, id) order"""
+    raw = f"{analysis.created_at.isoformat()}|{analysis.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, analysis_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def waveform_peaks_for(audio_path):
+    """Decode a recording and build its peak pyramid, or None if it cannot be decoded"""
+    try:
+        decoded = decode_audio(audio_path)
+        return compute_waveform_peaks(decoded.samples, decoded.sample_rate)
+    except Exception as e:
+        logger.warning(f"Could not compute waveform peaks for {audio_path}: {e}")
+        return None
+
+def analyze_recording(audio_path, digest=None, move=False):
+    """
+    Put a recording in the audio store and run the analyzer on the stored copy.
+    Touches no database state, so it can run on a worker thread.
+    
+    Returns (audio_sha256, analysis_result, waveform_peaks)
+    """
+    store = get_audio_store()
+    audio_sha256 = store.put_file(audio_path, digest=digest, move=move)
+    stored_path = store.local_path(audio_sha256)
+    
+    analysis_result = analyze_audio_file(stored_path)
+    # The analyzer builds peaks from the waveform it already decoded; fallback analysis does not
+    waveform_peaks = analysis_result.pop('waveform_peaks', None)
+    if waveform_peaks is None:
+        waveform_peaks = waveform_peaks_for(stored_path)
+    return audio_sha256, analysis_result, waveform_peaks
+
+def build_analysis_record(user_id, audio_sha256, analysis_result, waveform_peaks):
+    """
+    AnalysisResult row for an analyzed recording, not yet added to the session.
+    The recording is referenced by digest only: archival may re-encode or move
+    the stored file, so its path is resolved through the store when needed.
+    """
+    return AnalysisResult(
+        user_id=user_id,
+        audio_sha256=audio_sha256,
+        severity=analysis_result['severity'],
+        score=int(analysis_result['stutter_probability'] * 100),
+        confidence=analysis_result['confidence'],
+        stutter_count=analysis_result['analysis_data']['overall_assessment']['stutter_count'],
+        word_count=0,  # Could be calculated from audio
+        analysis_data=analysis_result,
+        waveform_peaks=waveform_peaks
+    )
+
+def analyze_and_store(user_id, audio_path, digest=None, move=False):
+    """
+    Put a recording in the audio store, run the analyzer on the stored copy
+    and save the AnalysisResult row referencing it by content digest
+    """
+    audio_sha256, analysis_result, waveform_peaks = analyze_recording(audio_path, digest, move)
+    analysis_record = build_analysis_record(user_id, audio_sha256, analysis_result, waveform_peaks)
+    
+    db.session.add(analysis_record)
+    db.session.commit()
+    return analysis_record, analysis_result
+
+def save_upload_to_temp(file):
+    """Save an uploaded file to a temporary path named after its sniffed container"""
+    # Sniff the real container; browsers send WebM/Opus whatever the filename says
+    header = file.stream.read(32)
+    file.stream.seek(0)
+    container = sniff_container(header)
+    suffix = '.' + CONTAINER_EXTENSIONS.get(container, file.filename.rsplit('.', 1)[1].lower())
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        file.save(temp_file.name)
+        return temp_file.name
+
+def remove_temp_file(temp_path):
+    """Clean up a temporary upload if the store copied rather than moved it"""
+    try:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    except Exception as e:
+        logger.warning(f"Could not delete temporary file {temp_path}: {e}")
+
+def analysis_response(analysis_record, analysis_result, message='Audio analysis completed successfully'):
+    """Build the upload response body for a stored analysis"""
+    return {
+        'message': message,
+        'analysis_id': analysis_record.id,
+        'results': {
+            'severity': analysis_result['severity'],
+            'score': int(analysis_result['stutter_probability'] * 100),
+            'confidence': analysis_result['confidence'],
+            'details': analysis_result['analysis_data'],
+            'recommendations': analysis_result['recommendations'],
+            'exercises': analysis_result['exercises'],
+            'decode_latency_ms': analysis_result.get('decode_latency_ms')
+        }
+    }
+
 @analysis_bp.route('/upload', methods=['POST'])
 @jwt_required()
+@idempotent
 def upload_audio():
     """Upload and analyze audio file for stuttering detection"""
     try:
@@ -60,94 +200,253 @@ def upload_audio():
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg'}), 400
+            return jsonify({'error': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg, webm'}), 400
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            file.save(temp_file.name)
-            temp_path = temp_file.name
+        temp_path = save_upload_to_temp(file)
+        try:
+            analysis_record, analysis_result = analyze_and_store(user_id, temp_path, move=True)
+            return jsonify(analysis_response(analysis_record, analysis_result))
+        finally:
+            remove_temp_file(temp_path)
+                
+    except Exception as e:
+        logger.error(f"Error in audio upload: {e}")
+        return jsonify({'error': 'Failed to process audio file'}), 500
+
+@analysis_bp.route('/upload/batch', methods=['POST'])
+@jwt_required()
+@idempotent
+def upload_audio_batch():
+    """
+    Analyze several recordings (repeated 'audio' parts) in parallel and
+    save their AnalysisResult rows in one transaction. Returns a result or
+    an error for each file, in upload order.
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        files = [f for f in request.files.getlist('audio') if f.filename]
+        if not files:
+            return jsonify({'error': 'No audio files provided'}), 400
+        if len(files) > current_app.config['BATCH_UPLOAD_MAX_FILES']:
+            return jsonify({'error': f"At most {current_app.config['BATCH_UPLOAD_MAX_FILES']} files per batch"}), 400
+        invalid = [f.filename for f in files if not allowed_file(f.filename)]
+        if invalid:
+            return jsonify({'error': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg, webm', 'files': invalid}), 400
         
+        temp_paths = []
         try:
-            # Analyze the audio file
-            analysis_result = analyze_audio_file(temp_path)
+            for file in files:
+                temp_paths.append(save_upload_to_temp(file))
             
-            # Save analysis result to database
-            analysis_record = AnalysisResult(
-                user_id=user_id,
-                audio_file_path=temp_path,  # Store the path for reference
-                severity=analysis_result['severity'],
-                score=int(analysis_result['stutter_probability'] * 100),
-                confidence=analysis_result['confidence'],
-                stutter_count=analysis_result['analysis_data']['overall_assessment']['stutter_count'],
-                word_count=0,  # Could be calculated from audio
-                analysis_data=analysis_result
-            )
+            # Fan out to the batch workers; each one stores and analyzes a single recording
+            futures = [get_batch_executor().submit(analyze_recording, path, None, True) for path in temp_paths]
             
-            db.session.add(analysis_record)
-            db.session.commit()
+            entries = []
+            records = []
+            for file, future in zip(files, futures):
+                try:
+                    analyzed = future.result()
+                except Exception as e:
+                    logger.error(f"Error analyzing {file.filename} in batch: {e}")
+                    entries.append({'filename': file.filename, 'error': 'Failed to process audio file'})
+                    continue
+                record = build_analysis_record(user_id, *analyzed)
+                records.append(record)
+                entries.append({'filename': file.filename, 'record': record, 'result': analyzed[1]})
             
-            # Return the analysis results
-            return jsonify({
-                'message': 'Audio analysis completed successfully',
-                'analysis_id': analysis_record.id,
-                'results': {
-                    'severity': analysis_result['severity'],
-                    'score': int(analysis_result['stutter_probability'] * 100),
-                    'confidence': analysis_result['confidence'],
-                    'details': analysis_result['analysis_data'],
-                    'recommendations': analysis_result['recommendations'],
-                    'exercises': analysis_result['exercises']
-                }
-            })
+            if not records:
+                return jsonify({'error': 'Failed to process audio files', 'results': entries}), 500
             
+            db.session.add_all(records)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_path)
-            except Exception as e:
-                logger.warning(f"Could not delete temporary file {temp_path}: {e}")
-                
+            for temp_path in temp_paths:
+                remove_temp_file(temp_path)
+        
+        results = []
+        for entry in entries:
+            if 'record' in entry:
+                results.append({'filename': entry['filename'], **analysis_response(entry['record'], entry['result'])})
+            else:
+                results.append(entry)
+        
+        return jsonify({
+            'message': f'Analyzed {len(records)} of {len(files)} recordings',
+            'succeeded': len(records),
+            'failed': len(files) - len(records),
+            'results': results
+        })
+        
     except Exception as e:
-        logger.error(f"Error in audio upload: {e}")
-        return jsonify({'error': 'Failed to process audio file'}), 500
+        logger.error(f"Error in batch audio upload: {e}")
+        return jsonify({'error': 'Failed to process audio files'}), 500
 
 @analysis_bp.route('/results/<int:analysis_id>', methods=['GET'])
 @jwt_required()
 def get_analysis_results(analysis_id):
-    """Get analysis results by ID"""
+    """
+    Get analysis results by ID. Results never change once written, so the
+    serialized body is cached per user and served with a strong ETag;
+    a matching If-None-Match gets 304 without touching the database.
+    """
+    try:
+        user_id = get_jwt_identity()
+        cache_key = (str(user_id), analysis_id)
+        
+        cached = results_cache.get(cache_key)
+        if cached is None:
+            # Get analysis result together with its detail row
+            analysis = AnalysisResult.query.options(db.joinedload(AnalysisResult.detail))\
+                .filter_by(id=analysis_id, user_id=user_id).first()
+            if not analysis:
+                return jsonify({'error': 'Analysis not found'}), 404
+            
+            body = jsonify({
+                'id': analysis.id,
+                'severity': analysis.severity,
+                'score': analysis.score,
+                'confidence': analysis.confidence,
+                'stutter_count': analysis.stutter_count,
+                'word_count': analysis.word_count,
+                'details': analysis.analysis_data,
+                'created_at': analysis.created_at.isoformat()
+            }).get_data()
+            cached = results_cache.put(cache_key, body)
+        
+        response = current_app.response_class(cached.body, mimetype='application/json')
+        response.set_etag(cached.etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        logger.error(f"Error getting analysis results: {e}")
+        return jsonify({'error': 'Failed to retrieve analysis results'}), 500
+
+@analysis_bp.route('/results/<int:analysis_id>/peaks', methods=['GET'])
+@jwt_required()
+def get_waveform_peaks(analysis_id):
+    """
+    Serve the precomputed min/max peak pyramid for drawing the waveform.
+    Returns the packed binary blob, or one level as JSON with ?format=json&level=N
+    (level 0 is the finest).
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        row = db.session.query(AnalysisResult.waveform_peaks)\
+            .filter_by(id=analysis_id, user_id=user_id).first()
+        if not row:
+            return jsonify({'error': 'Analysis not found'}), 404
+        if not row.waveform_peaks:
+            return jsonify({'error': 'No waveform available for this analysis'}), 404
+        
+        if request.args.get('format') == 'json':
+            peaks = decode_peaks(row.waveform_peaks)
+            level = request.args.get('level', 0, type=int)
+            if not 0 <= level < len(peaks['levels']):
+                return jsonify({'error': f"level must be between 0 and {len(peaks['levels']) - 1}"}), 400
+            mins, maxs = peaks['levels'][level]
+            response = make_response(jsonify({
+                'sample_rate': peaks['sample_rate'],
+                'num_samples': peaks['num_samples'],
+                'levels': len(peaks['levels']),
+                'level': level,
+                'min': mins.tolist(),
+                'max': maxs.tolist()
+            }))
+        else:
+            response = make_response(row.waveform_peaks)
+            response.mimetype = 'application/octet-stream'
+        
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.add_etag()
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        logger.error(f"Error getting waveform peaks: {e}")
+        return jsonify({'error': 'Failed to retrieve waveform'}), 500
+
+@analysis_bp.route('/results/<int:analysis_id>/reanalyze', methods=['POST'])
+@jwt_required()
+@idempotent
+def reanalyze_recording(analysis_id):
+    """Re-run analysis on a stored recording without re-uploading it"""
     try:
         user_id = get_jwt_identity()
         
-        # Get analysis result
         analysis = AnalysisResult.query.filter_by(id=analysis_id, user_id=user_id).first()
         if not analysis:
             return jsonify({'error': 'Analysis not found'}), 404
         
-        return jsonify({
-            'id': analysis.id,
-            'severity': analysis.severity,
-            'score': analysis.score,
-            'confidence': analysis.confidence,
-            'stutter_count': analysis.stutter_count,
-            'word_count': analysis.word_count,
-            'details': analysis.analysis_data,
-            'created_at': analysis.created_at.isoformat()
-        })
+        store = get_audio_store()
+        if not analysis.audio_sha256 or not store.exists(analysis.audio_sha256):
+            return jsonify({'error': 'Recording is not available for re-analysis'}), 404
+        
+        analysis_record, analysis_result = analyze_and_store(
+            user_id, store.local_path(analysis.audio_sha256), digest=analysis.audio_sha256
+        )
+        return jsonify(analysis_response(analysis_record, analysis_result, 'Recording re-analyzed successfully'))
         
     except Exception as e:
-        logger.error(f"Error getting analysis results: {e}")
-        return jsonify({'error': 'Failed to retrieve analysis results'}), 500
+        logger.error(f"Error re-analyzing recording: {e}")
+        return jsonify({'error': 'Failed to re-analyze recording'}), 500
 
 @analysis_bp.route('/history', methods=['GET'])
 @jwt_required()
 def get_analysis_history():
-    """Get user's analysis history"""
+    """
+    Get user's analysis history, newest first, one page at a time.
+    
+    Query params: limit (default 20, max 100), cursor (next_cursor from the
+    previous page), severity (comma-separated), from / to (ISO dates).
+    Pages are keyed on (created_at, id) so every page is an index range scan.
+    """
     try:
         user_id = get_jwt_identity()
         
-        # Get user's analysis history
-        analyses = AnalysisResult.query.filter_by(user_id=user_id)\
-            .order_by(AnalysisResult.created_at.desc()).limit(20).all()
+        limit = request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+        if limit < 1 or limit > HISTORY_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}'}), 400
+        
+        query = AnalysisResult.query.options(db.load_only(
+            AnalysisResult.id, AnalysisResult.severity, AnalysisResult.score,
+            AnalysisResult.confidence, AnalysisResult.created_at
+        )).filter(AnalysisResult.user_id == user_id)
+        
+        severities = [s.strip() for s in request.args.get('severity', '').split(',') if s.strip()]
+        if severities:
+            query = query.filter(AnalysisResult.severity.in_(severities))
+        
+        try:
+            if request.args.get('from'):
+                query = query.filter(AnalysisResult.created_at >= datetime.fromisoformat(request.args['from']))
+            if request.args.get('to'):
+                end = request.args['to']
+                # A bare date includes the whole day
+                end_at = datetime.fromisoformat(end) + (timedelta(days=1) if len(end) == 10 else timedelta(0))
+                query = query.filter(AnalysisResult.created_at < end_at)
+        except ValueError:
+            return jsonify({'error': 'from and to must be ISO dates'}), 400
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_history_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(
+                db.tuple_(AnalysisResult.created_at, AnalysisResult.id) < (cursor_created_at, cursor_id)
+            )
+        
+        # One extra row tells us whether there is another page
+        analyses = query.order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())\
+            .limit(limit + 1).all()
+        has_more = len(analyses) > limit
+        analyses = analyses[:limit]
         
         history = []
         for analysis in analyses:
@@ -159,7 +458,11 @@ def get_analysis_history():
                 'created_at': analysis.created_at.isoformat()
             })
         
-        return jsonify({'results': history})
+        return jsonify({
+            'results': history,
+            'next_cursor': encode_history_cursor(analyses[-1]) if has_more else None,
+            'has_more': has_more
+        })
         
     except Exception as e:
         logger.error(f"Error getting analysis history: {e}")
@@ -183,7 +486,6 @@ def analyze_audio_features():
         # Save analysis result to database
         analysis_record = AnalysisResult(
             user_id=user_id,
-            audio_file_path=None,  # No file for feature-based analysis
             severity=analysis_result['severity'],
             score=int(analysis_result['stutter_probability'] * 100),
             confidence=analysis_result['confidence'],
@@ -219,10 +521,9 @@ def get_analysis_stats():
     try:
         user_id = get_jwt_identity()
         
-        # Get user's analysis statistics
-        total_analyses = AnalysisResult.query.filter_by(user_id=user_id).count()
-        
-        if total_analyses == 0:
+        # Maintained on every insert by analysis_stats.py, so this is one primary-key lookup
+        stats = get_user_stats(user_id)
+        if not stats or stats.total_analyses == 0:
             return jsonify({
                 'total_analyses': 0,
                 'average_score': 0,
@@ -230,36 +531,38 @@ def get_analysis_stats():
                 'recent_trend': 'no_data'
             })
         
-        # Calculate average score
-        avg_score = db.session.query(db.func.avg(AnalysisResult.score))\
-            .filter_by(user_id=user_id).scalar() or 0
-        
-        # Get severity distribution
-        severity_counts = db.session.query(
-            AnalysisResult.severity, 
-            db.func.count(AnalysisResult.id)
-        ).filter_by(user_id=user_id).group_by(AnalysisResult.severity).all()
-        
-        severity_distribution = {severity: count for severity, count in severity_counts}
-        
         # Get recent trend (last 5 analyses)
-        recent_analyses = AnalysisResult.query.filter_by(user_id=user_id)\
-            .order_by(AnalysisResult.created_at.desc()).limit(5).all()
-        
-        if len(recent_analyses) >= 2:
-            recent_avg = sum(a.score for a in recent_analyses[:2]) / 2
-            older_avg = sum(a.score for a in recent_analyses[2:]) / (len(recent_analyses) - 2)
+        recent_scores = [entry['score'] or 0 for entry in stats.recent_analyses or []]
+        if len(recent_scores) >= 2:
+            recent_avg = sum(recent_scores[:2]) / 2
+            older_scores = recent_scores[2:]
+            older_avg = sum(older_scores) / len(older_scores) if older_scores else recent_avg
             trend = 'improving' if recent_avg > older_avg else 'declining' if recent_avg < older_avg else 'stable'
         else:
             trend = 'insufficient_data'
         
         return jsonify({
-            'total_analyses': total_analyses,
-            'average_score': round(avg_score, 1),
-            'severity_distribution': severity_distribution,
+            'total_analyses': stats.total_analyses,
+            'average_score': round(average_score(stats), 1),
+            'severity_distribution': stats.severity_counts or {},
             'recent_trend': trend
         })
         
     except Exception as e:
         logger.error(f"Error getting analysis stats: {e}")
-        return jsonify({'error': 'Failed to retrieve analysis statistics'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to retrieve analysis statistics'}), 500
+
+@analysis_bp.route('/pipeline-stats', methods=['GET'])
+@jwt_required()
+def get_analysis_pipeline_stats():
+    """Get decode latency and inference buffer allocation counts"""
+    try:
+        return jsonify({
+            'ml_model_available': ML_MODEL_AVAILABLE,
+            **get_pipeline_stats(),
+            'results_cache': results_cache.stats(),
+            'analytics_cache': get_analytics_cache().stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting pipeline stats: {e}")
+        return jsonify({'error': 'Failed to retrieve pipeline statistics'}), 500
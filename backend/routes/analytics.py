@@ -1,13 +1,25 @@
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Progress, AnalysisResult, Exercise
-from sqlalchemy import func, desc
+from models import Progress, Exercise
+from sqlalchemy import func, desc, case, select
 from datetime import datetime, timedelta
+from config import Config
+from db import db
+from analytics_rollups import load_window, monthly_totals, utc_today
+from practice_streaks import get_streaks
+from analytics_engine import SessionColumns, improvement_rate
+from analytics_cache import cached_analytics
+from dashboard_snapshots import get_dashboard_snapshot
+from report_jobs import latest_snapshot, is_stale, request_report
+from population_benchmarks import compare
 import numpy as np
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Sessions fetched individually for recent-score metrics; everything else comes from rollups
+RECENT_SESSIONS = 20
+
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_analytics_dashboard():
@@ -16,54 +28,98 @@ def get_analytics_dashboard():
         
         # Time range filter
         days = request.args.get('days', 30, type=int)
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Get progress data
-        progress_data = Progress.query.filter_by(user_id=user_id)\
-            .filter(Progress.created_at >= start_date)\
-            .order_by(Progress.created_at).all()
-        
-        # Get analysis results
-        analysis_data = AnalysisResult.query.filter_by(user_id=user_id)\
-            .filter(AnalysisResult.created_at >= start_date)\
-            .order_by(AnalysisResult.created_at).all()
-        
-        # Calculate advanced metrics
-        analytics = {
-            'overview': calculate_overview_metrics(progress_data, analysis_data),
-            'trends': calculate_trends(progress_data, analysis_data),
-            'performance': calculate_performance_metrics(progress_data, analysis_data),
-            'recommendations': generate_recommendations(progress_data, analysis_data),
-            'goals': calculate_goal_progress(user_id, progress_data)
-        }
-        
-        return jsonify(analytics)
+        body = cached_analytics(user_id, 'dashboard', {'days': days},
+                                lambda: dashboard_for(user_id, days))
+        return Response(body, mimetype='application/json')
     except Exception as e:
         import logging
         logging.exception('Error in get_analytics_dashboard')
         return jsonify({'error': 'Failed to fetch dashboard analytics', 'details': str(e)}), 500
 
+def dashboard_for(user_id, days):
+    """Standard windows are served from the maintained snapshots; any other length is computed on demand"""
+    if days in Config.DASHBOARD_SNAPSHOT_WINDOWS:
+        return get_dashboard_snapshot(user_id, days)
+    return compute_dashboard(user_id, days)
+
+def compute_dashboard(user_id, days):
+    # Windows run from the start of their first day, as the daily rollups do
+    start_day = utc_today() - timedelta(days=days)
+    
+    # Daily rollups cover the window in at most one row per day
+    window = load_window(user_id, start_day)
+    return build_dashboard(window, load_recent_sessions(user_id, start_day))
+
+def load_recent_sessions(user_id, start_day, connection=None):
+    """Scores of the last few sessions since start_day, oldest first, for recent-score and consistency goals"""
+    return (connection or db.session).execute(
+        select(Progress.score, Progress.created_at)
+        .where(Progress.user_id == user_id, Progress.created_at >= datetime.combine(start_day, datetime.min.time()))
+        .order_by(Progress.created_at.desc()).limit(RECENT_SESSIONS)
+    ).all()[::-1]
+
+def build_dashboard(window, recent_sessions):
+    # Calculate advanced metrics
+    return {
+        'overview': calculate_overview_metrics(window),
+        'trends': calculate_trends(window),
+        'performance': calculate_performance_metrics(window),
+        'recommendations': generate_recommendations(window, recent_sessions),
+        'goals': calculate_goal_progress(window, recent_sessions)
+    }
+
 @analytics_bp.route('/detailed-report', methods=['GET'])
 @jwt_required()
 def get_detailed_report():
     user_id = get_jwt_identity()
     
-    # Get comprehensive data for detailed analysis
-    all_progress = Progress.query.filter_by(user_id=user_id)\
-        .order_by(Progress.created_at).all()
-    
-    all_analyses = AnalysisResult.query.filter_by(user_id=user_id)\
-        .order_by(AnalysisResult.created_at).all()
-    
-    report = {
-        'summary': generate_comprehensive_summary(all_progress, all_analyses),
-        'detailed_trends': calculate_detailed_trends(all_progress, all_analyses),
-        'exercise_effectiveness': analyze_exercise_effectiveness(user_id),
-        'improvement_patterns': identify_improvement_patterns(all_progress),
-        'comparative_analysis': generate_comparative_analysis(all_progress, all_analyses)
+    # Serve the last generated report at once; regenerate in the background when it is out of date
+    snapshot = latest_snapshot(user_id)
+    job = None
+    if snapshot is None or request.args.get('refresh') == '1' or is_stale(snapshot):
+        job = request_report(user_id, compute_detailed_report)
+        if job is None:
+            # A concurrent request's job has already finished; serve what it produced
+            snapshot = latest_snapshot(user_id)
+    
+    if snapshot is None:
+        return jsonify({
+            'status': job.status if job else 'pending',
+            'version': job.version if job else None,
+            'message': 'Report is being generated; progress is sent as report_progress events'
+        }), 202
+    
+    return jsonify({
+        **snapshot.data,
+        'snapshot': {
+            'version': snapshot.version,
+            'generated_at': snapshot.completed_at.isoformat(),
+            'refreshing': job is not None,
+            'next_version': job.version if job else None
+        }
+    })
+
+REPORT_SECTIONS = ('summary', 'detailed_trends', 'exercise_effectiveness', 'improvement_patterns', 'comparative_analysis')
+
+def compute_detailed_report(user_id, on_step=None):
+    """Build the detailed report, calling on_step(section, completed, total) after each section"""
+    # One narrow query for the whole history; every section works on the same arrays
+    sessions = SessionColumns.load(user_id)
+    
+    builders = {
+        'summary': lambda: generate_comprehensive_summary(sessions, user_id),
+        'detailed_trends': lambda: calculate_detailed_trends(user_id),
+        'exercise_effectiveness': lambda: analyze_exercise_effectiveness(user_id),
+        'improvement_patterns': lambda: identify_improvement_patterns(sessions),
+        'comparative_analysis': lambda: generate_comparative_analysis(sessions)
     }
     
-    return jsonify(report)
+    report = {}
+    for completed, section in enumerate(REPORT_SECTIONS, 1):
+        report[section] = builders[section]()
+        if on_step:
+            on_step(section, completed, len(REPORT_SECTIONS))
+    return report
 
 @analytics_bp.route('/real-time-metrics', methods=['GET'])
 @jwt_required()
@@ -75,12 +131,10 @@ def get_real_time_metrics():
         .filter(Progress.created_at >= datetime.now() - timedelta(hours=24))\
         .order_by(Progress.created_at.desc()).all()
     
-    recent_analyses = AnalysisResult.query.filter_by(user_id=user_id)\
-        .filter(AnalysisResult.created_at >= datetime.now() - timedelta(hours=24))\
-        .order_by(AnalysisResult.created_at.desc()).all()
-    
+    streaks = get_streaks(user_id)
     metrics = {
-        'current_streak': calculate_current_streak(user_id),
+        'current_streak': streaks['current_streak'],
+        'longest_streak': streaks['longest_streak'],
         'today_sessions': len(recent_progress),
         'recent_scores': [p.score for p in recent_progress[:5]],
         'current_trend': calculate_current_trend(recent_progress),
@@ -89,84 +143,57 @@ def get_real_time_metrics():
     
     return jsonify(metrics)
 
-def calculate_overview_metrics(progress_data, analysis_data):
+def calculate_overview_metrics(window):
     """Calculate high-level overview metrics"""
-    if not progress_data:
+    if not window.total_sessions:
         return {'total_sessions': 0, 'average_score': 0, 'improvement_rate': 0}
     
-    scores = [p.score for p in progress_data]
-    
     return {
-        'total_sessions': len(progress_data),
-        'average_score': sum(scores) / len(scores),
-        'best_score': max(scores),
-        'improvement_rate': calculate_improvement_rate(scores),
-        'consistency_score': calculate_consistency_score(progress_data)
+        'total_sessions': window.total_sessions,
+        'average_score': window.average_score,
+        'best_score': window.best_score,
+        'improvement_rate': window.improvement_rate(),
+        'consistency_score': window.consistency_score()
     }
 
-def calculate_trends(progress_data, analysis_data):
+def calculate_trends(window):
     """Calculate trend analysis"""
-    if len(progress_data) < 2:
+    if window.total_sessions < 2:
         return {'score_trend': [], 'severity_trend': []}
     
-    # Group by week for trend analysis
-    weekly_scores = {}
-    weekly_severity = {}
-    
-    for progress in progress_data:
-        week_key = progress.created_at.strftime('%Y-W%U')
-        if week_key not in weekly_scores:
-            weekly_scores[week_key] = []
-            weekly_severity[week_key] = []
-        weekly_scores[week_key].append(progress.score)
-        if progress.severity_level:
-            weekly_severity[week_key].append(progress.severity_level)
-    
-    score_trend = [
-        {
-            'week': week,
-            'average_score': sum(scores) / len(scores),
-            'session_count': len(scores)
-        }
-        for week, scores in weekly_scores.items()
-    ]
-    
     return {
-        'score_trend': sorted(score_trend, key=lambda x: x['week']),
-        'severity_distribution': calculate_severity_distribution(analysis_data)
+        'score_trend': window.weekly_trend(),
+        'severity_distribution': window.severity_distribution()
     }
 
-def calculate_performance_metrics(progress_data, analysis_data):
+def calculate_performance_metrics(window):
     """Calculate detailed performance metrics"""
-    if not progress_data:
+    if not window.score_count:
         return {}
     
-    scores = [p.score for p in progress_data]
-    
-    # Performance quartiles
-    sorted_scores = sorted(scores)
-    n = len(sorted_scores)
+    # Performance quartiles, read off the merged score histogram
+    n = window.score_count
     
     return {
         'quartiles': {
-            'q1': sorted_scores[n//4] if n >= 4 else min(scores),
-            'q2': sorted_scores[n//2] if n >= 2 else sum(scores)/len(scores),
-            'q3': sorted_scores[3*n//4] if n >= 4 else max(scores)
+            'q1': window.nth_score(n//4) if n >= 4 else window.nth_score(0),
+            'q2': window.nth_score(n//2) if n >= 2 else window.average_score,
+            'q3': window.nth_score(3*n//4) if n >= 4 else window.best_score
         },
-        'volatility': np.std(scores) if len(scores) > 1 else 0,
-        'peak_performance': max(scores),
-        'performance_stability': calculate_stability_index(scores)
+        'volatility': window.std(),
+        'peak_performance': window.best_score,
+        'performance_stability': stability_index(window.average_score, window.std(), n)
     }
 
-def generate_recommendations(progress_data, analysis_data):
+def generate_recommendations(window, recent_sessions):
     """Generate personalized recommendations"""
     recommendations = []
     
-    if not progress_data:
+    if not window.total_sessions:
         return ['Start with regular practice sessions to establish a baseline']
     
-    recent_scores = [p.score for p in progress_data[-5:]]
-    avg_recent = sum(recent_scores) / len(recent_scores)
+    recent_scores = [p.score for p in recent_sessions[-5:] if p.score is not None]
+    avg_recent = sum(recent_scores) / len(recent_scores) if recent_scores else 0
     
     if avg_recent < 60:
         recommendations.append("Focus on basic breathing exercises to improve foundation")
@@ -176,25 +203,12 @@ def generate_recommendations(progress_data, analysis_data):
         recommendations.append("Challenge yourself with advanced techniques")
     
     # Consistency recommendations
-    session_gaps = calculate_session_gaps(progress_data)
+    session_gaps = window.average_gap()
     if session_gaps > 2:
         recommendations.append("Try to maintain more consistent practice schedule")
     
     return recommendations
 
-def calculate_improvement_rate(scores):
-    """Calculate improvement rate over time"""
-    if len(scores) < 2:
-        return 0
-    
-    first_half = scores[:len(scores)//2]
-    second_half = scores[len(scores)//2:]
-    
-    avg_first = sum(first_half) / len(first_half)
-    avg_second = sum(second_half) / len(second_half)
-    
-    return ((avg_second - avg_first) / avg_first * 100) if avg_first > 0 else 0
-
 def calculate_consistency_score(progress_data):
     """Calculate how consistent the user's practice is"""
     if len(progress_data) < 3:
@@ -213,34 +227,13 @@ def calculate_consistency_score(progress_data):
     return min(100, consistency)
 
 def calculate_current_streak(user_id):
-    """Calculate current consecutive days of practice"""
-    progress = Progress.query.filter_by(user_id=user_id)\
-        .order_by(Progress.created_at.desc()).all()
-    
-    if not progress:
+    """Current consecutive days of practice, from the maintained PracticeStreak row"""
+    if user_id is None:
         return 0
-    
-    streak = 0
-    current_date = datetime.now().date()
-    
-    for p in progress:
-        session_date = p.created_at.date()
-        if (current_date - session_date).days <= streak + 1:
-            if (current_date - session_date).days == streak:
-                current_date = session_date
-                streak += 1
-            elif (current_date - session_date).days == streak + 1:
-                current_date = session_date
-                streak += 1
-        else:
-            break
-    
-    return streak
+    return get_streaks(user_id)['current_streak']
 
-def calculate_goal_progress(user_id, progress_data):
+def calculate_goal_progress(window, recent_sessions):
     """Calculate progress towards user goals"""
-    user = User.query.get(user_id)
-    
     # Default goals if not set
     goals = {
         'weekly_sessions': 5,
@@ -248,24 +241,23 @@ def calculate_goal_progress(user_id, progress_data):
         'consistency_target': 80
     }
     
-    if not progress_data:
+    if not window.total_sessions:
         return {goal: {'current': 0, 'target': target, 'progress': 0} 
                 for goal, target in goals.items()}
     
     # Calculate current week progress
-    week_start = datetime.now() - timedelta(days=7)
-    week_sessions = [p for p in progress_data if p.created_at >= week_start]
+    week_sessions = window.sessions_since(utc_today() - timedelta(days=7))
     
-    recent_scores = [p.score for p in progress_data[-10:]]
+    recent_scores = [p.score for p in recent_sessions[-10:] if p.score is not None]
     avg_score = sum(recent_scores) / len(recent_scores) if recent_scores else 0
     
-    consistency = calculate_consistency_score(progress_data[-20:])
+    consistency = calculate_consistency_score(recent_sessions[-20:])
     
     return {
         'weekly_sessions': {
-            'current': len(week_sessions),
+            'current': week_sessions,
             'target': goals['weekly_sessions'],
-            'progress': min(100, (len(week_sessions) / goals['weekly_sessions']) * 100)
+            'progress': min(100, (week_sessions / goals['weekly_sessions']) * 100)
         },
         'target_score': {
             'current': avg_score,
@@ -279,71 +271,34 @@ def calculate_goal_progress(user_id, progress_data):
         }
     }
 
-def calculate_severity_distribution(analysis_data):
-    """Calculate distribution of severity levels"""
-    if not analysis_data:
-        return {'none': 0, 'mild': 0, 'severe': 0}
-    
-    severities = [a.severity for a in analysis_data if a.severity]
-    total = len(severities)
-    
-    return {
-        'none': severities.count('none') / total * 100 if total > 0 else 0,
-        'mild': severities.count('mild') / total * 100 if total > 0 else 0,
-        'severe': severities.count('severe') / total * 100 if total > 0 else 0
-    }
-
-def calculate_session_gaps(progress_data):
-    """Calculate average gap between sessions"""
-    if len(progress_data) < 2:
-        return 0
-    
-    dates = [p.created_at.date() for p in progress_data]
-    gaps = [(dates[i] - dates[i-1]).days for i in range(1, len(dates))]
-    
-    return sum(gaps) / len(gaps)
-
-def calculate_stability_index(scores):
-    """Calculate how stable the scores are"""
-    if len(scores) < 2:
+def stability_index(mean_score, std_dev, count):
+    """Stability index from the mean and standard deviation of the scores"""
+    if count < 2:
         return 100
     
-    # Calculate coefficient of variation
-    mean_score = sum(scores) / len(scores)
-    variance = sum((score - mean_score) ** 2 for score in scores) / len(scores)
-    std_dev = variance ** 0.5
-    
     cv = (std_dev / mean_score) * 100 if mean_score > 0 else 0
     
     # Convert to stability index (lower CV = higher stability)
     return max(0, 100 - cv)
 
-def generate_comprehensive_summary(all_progress, all_analyses):
+def generate_comprehensive_summary(sessions, user_id):
     """Generate comprehensive user summary"""
-    if not all_progress:
+    if not sessions.total_sessions:
         return {'message': 'No data available for analysis'}
     
-    total_sessions = len(all_progress)
-    total_time = sum(p.session_duration or 0 for p in all_progress)
-    
-    scores = [p.score for p in all_progress]
-    improvement = calculate_improvement_rate(scores)
-    
     return {
-        'total_sessions': total_sessions,
-        'total_practice_time': total_time,
-        'overall_improvement': improvement,
-        'current_level': determine_current_level(scores[-10:] if len(scores) >= 10 else scores),
-        'achievements': calculate_achievements(all_progress, all_analyses)
+        'total_sessions': sessions.total_sessions,
+        'total_practice_time': sessions.total_duration,
+        'overall_improvement': sessions.improvement_rate(),
+        'current_level': determine_current_level(sessions.recent_average(10)),
+        'achievements': calculate_achievements(sessions, user_id)
     }
 
-def determine_current_level(recent_scores):
-    """Determine user's current skill level"""
-    if not recent_scores:
+def determine_current_level(avg_score):
+    """Determine user's current skill level from their recent average score"""
+    if avg_score is None:
         return 'Beginner'
     
-    avg_score = sum(recent_scores) / len(recent_scores)
-    
     if avg_score >= 85:
         return 'Advanced'
     elif avg_score >= 70:
@@ -351,94 +306,93 @@ def determine_current_level(recent_scores):
     else:
         return 'Beginner'
 
-def calculate_achievements(all_progress, all_analyses):
+def calculate_achievements(sessions, user_id):
     """Calculate user achievements"""
     achievements = []
     
-    if len(all_progress) >= 10:
+    if sessions.total_sessions >= 10:
         achievements.append('Dedicated Practitioner - 10+ sessions completed')
     
-    if len(all_progress) >= 50:
+    if sessions.total_sessions >= 50:
         achievements.append('Speech Warrior - 50+ sessions completed')
     
-    scores = [p.score for p in all_progress]
-    if scores and max(scores) >= 90:
+    if sessions.score_count and sessions.best_score >= 90:
         achievements.append('Excellence Achieved - Scored 90+')
     
-    streak = calculate_current_streak(all_progress[0].user_id if all_progress else None)
+    streak = calculate_current_streak(user_id)
     if streak >= 7:
         achievements.append(f'Consistency Champion - {streak} day streak')
     
     return achievements
 
-def calculate_detailed_trends(all_progress, all_analyses):
-    """Calculate detailed trend analysis"""
-    # Monthly trends
-    monthly_data = {}
-    
-    for progress in all_progress:
-        month_key = progress.created_at.strftime('%Y-%m')
-        if month_key not in monthly_data:
-            monthly_data[month_key] = {'scores': [], 'sessions': 0}
-        monthly_data[month_key]['scores'].append(progress.score)
-        monthly_data[month_key]['sessions'] += 1
-    
-    monthly_trends = []
-    for month, data in sorted(monthly_data.items()):
-        avg_score = sum(data['scores']) / len(data['scores'])
-        monthly_trends.append({
+def calculate_detailed_trends(user_id):
+    """Calculate detailed trend analysis from per-month totals grouped in the database"""
+    months = monthly_totals(user_id)
+    session_counts = np.array([sessions for _, sessions, _, _ in months], dtype=np.int64)
+    averages = np.array([score_sum / score_count if score_count else 0 for _, _, score_count, score_sum in months],
+                        dtype=np.float64)
+    
+    # Month-over-month improvement
+    improvements = np.zeros(len(months))
+    if len(months) > 1:
+        previous = averages[:-1]
+        np.divide((averages[1:] - previous) * 100, previous, out=improvements[1:], where=previous > 0)
+    
+    monthly_trends = [
+        {
             'month': month,
-            'average_score': avg_score,
-            'session_count': data['sessions'],
-            'improvement': 0  # Calculate month-over-month improvement
-        })
-    
-    # Calculate month-over-month improvement
-    for i in range(1, len(monthly_trends)):
-        prev_score = monthly_trends[i-1]['average_score']
-        curr_score = monthly_trends[i]['average_score']
-        improvement = ((curr_score - prev_score) / prev_score * 100) if prev_score > 0 else 0
-        monthly_trends[i]['improvement'] = improvement
+            'average_score': float(average),
+            'session_count': int(count),
+            'improvement': float(improvement)
+        }
+        for (month, _, _, _), count, average, improvement in zip(months, session_counts, averages, improvements)
+    ]
     
     return {
         'monthly_trends': monthly_trends,
-        'best_month': max(monthly_trends, key=lambda x: x['average_score']) if monthly_trends else None,
-        'most_active_month': max(monthly_trends, key=lambda x: x['session_count']) if monthly_trends else None
+        'best_month': monthly_trends[int(np.argmax(averages))] if monthly_trends else None,
+        'most_active_month': monthly_trends[int(np.argmax(session_counts))] if monthly_trends else None
     }
 
 def analyze_exercise_effectiveness(user_id):
     """Analyze which exercises are most effective for the user"""
-    # Get progress data with exercise information
-    progress_with_exercises = Progress.query.filter_by(user_id=user_id)\
-        .filter(Progress.exercise_id.isnot(None)).all()
-    
-    if not progress_with_exercises:
+    # Number each exercise's sessions in order, then aggregate per exercise in the same query;
+    # the (user_id, exercise_id, created_at) index serves both the filter and the window ordering
+    sessions = db.session.query(
+        Progress.exercise_id,
+        Progress.score,
+        func.row_number().over(
+            partition_by=Progress.exercise_id, order_by=(Progress.created_at, Progress.id)
+        ).label('position'),
+        func.count().over(partition_by=Progress.exercise_id).label('total')
+    ).filter(Progress.user_id == user_id, Progress.exercise_id.isnot(None)).subquery()
+
+    first_half = sessions.c.position <= sessions.c.total // 2
+    rows = db.session.query(
+        sessions.c.exercise_id,
+        Exercise.title,
+        func.count().label('session_count'),
+        func.avg(sessions.c.score).label('average_score'),
+        func.avg(case((first_half, sessions.c.score))).label('first_half_average'),
+        func.avg(case((~first_half, sessions.c.score))).label('second_half_average')
+    ).outerjoin(Exercise, Exercise.id == sessions.c.exercise_id)\
+        .group_by(sessions.c.exercise_id, Exercise.title).all()
+
+    if not rows:
         return {'message': 'No exercise-specific data available'}
-    
-    exercise_stats = {}
-    
-    for progress in progress_with_exercises:
-        exercise_id = progress.exercise_id
-        if exercise_id not in exercise_stats:
-            exercise_stats[exercise_id] = {'scores': [], 'sessions': 0}
-        exercise_stats[exercise_id]['scores'].append(progress.score)
-        exercise_stats[exercise_id]['sessions'] += 1
-    
-    # Calculate effectiveness for each exercise
+
     effectiveness = []
-    for exercise_id, stats in exercise_stats.items():
-        avg_score = sum(stats['scores']) / len(stats['scores'])
-        improvement = calculate_improvement_rate(stats['scores'])
-        
-        exercise = Exercise.query.get(exercise_id)
-        exercise_name = exercise.title if exercise else f"Exercise {exercise_id}"
-        
+    for row in rows:
+        avg_first = float(row.first_half_average or 0)
+        avg_second = float(row.second_half_average or 0)
+        improvement = ((avg_second - avg_first) / avg_first * 100) if row.session_count >= 2 and avg_first > 0 else 0
+
         effectiveness.append({
-            'exercise_id': exercise_id,
-            'exercise_name': exercise_name,
-            'average_score': avg_score,
+            'exercise_id': row.exercise_id,
+            'exercise_name': row.title or f"Exercise {row.exercise_id}",
+            'average_score': float(row.average_score or 0),
             'improvement_rate': improvement,
-            'session_count': stats['sessions']
+            'session_count': row.session_count
         })
     
     # Sort by effectiveness (combination of score and improvement)
@@ -449,49 +403,39 @@ def analyze_exercise_effectiveness(user_id):
         'all_exercises': effectiveness
     }
 
-def identify_improvement_patterns(all_progress):
+def identify_improvement_patterns(sessions):
     """Identify patterns in user improvement"""
-    if len(all_progress) < 10:
+    if sessions.score_count < 10:
         return {'message': 'Insufficient data for pattern analysis'}
     
-    scores = [p.score for p in all_progress]
+    # Identify improvement phases over runs of five sessions
+    starts, ends, averages, trends = sessions.phases(5)
+    phase_types = np.select([trends > 5, trends > -5], ['improving', 'stable'], 'declining')
     
-    # Identify improvement phases
-    phases = []
-    window_size = 5
-    
-    for i in range(0, len(scores) - window_size, window_size):
-        window_scores = scores[i:i + window_size]
-        avg_score = sum(window_scores) / len(window_scores)
-        trend = calculate_improvement_rate(window_scores)
-        
-        phase_start = all_progress[i].created_at
-        phase_end = all_progress[min(i + window_size - 1, len(all_progress) - 1)].created_at
-        
-        phases.append({
-            'start_date': phase_start.isoformat(),
-            'end_date': phase_end.isoformat(),
-            'average_score': avg_score,
-            'trend': trend,
-            'phase_type': 'improving' if trend > 5 else 'stable' if trend > -5 else 'declining'
-        })
+    phases = [
+        {
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'average_score': float(average),
+            'trend': float(trend),
+            'phase_type': str(phase_type)
+        }
+        for start, end, average, trend, phase_type
+        in zip(starts.astype(object), ends.astype(object), averages, trends, phase_types)
+    ]
     
     return {
         'improvement_phases': phases,
-        'overall_pattern': analyze_overall_pattern(scores),
-        'best_improvement_period': max(phases, key=lambda x: x['trend']) if phases else None
+        'overall_pattern': analyze_overall_pattern(sessions),
+        'best_improvement_period': phases[int(np.argmax(trends))] if phases else None
     }
 
-def analyze_overall_pattern(scores):
+def analyze_overall_pattern(sessions):
     """Analyze the overall improvement pattern"""
-    if len(scores) < 4:
+    if sessions.score_count < 4:
         return 'insufficient_data'
     
-    quarters = len(scores) // 4
-    q1_avg = sum(scores[:quarters]) / quarters
-    q4_avg = sum(scores[-quarters:]) / quarters
-    
-    overall_improvement = ((q4_avg - q1_avg) / q1_avg * 100) if q1_avg > 0 else 0
+    overall_improvement = sessions.quarter_change()
     
     if overall_improvement > 20:
         return 'strong_improvement'
@@ -502,55 +446,47 @@ def analyze_overall_pattern(scores):
     else:
         return 'declining'
 
-def generate_comparative_analysis(all_progress, all_analyses):
-    """Generate comparative analysis against benchmarks"""
-    if not all_progress:
+def generate_comparative_analysis(sessions):
+    """Compare the user with all users, via the population sketches"""
+    if not sessions.total_sessions:
         return {'message': 'No data for comparison'}
     
-    user_avg = sum(p.score for p in all_progress) / len(all_progress)
-    user_sessions = len(all_progress)
-    
-    # These would typically come from aggregate user data
-    benchmarks = {
-        'average_score_benchmark': 75,
-        'active_user_sessions': 25,
-        'improvement_rate_benchmark': 15
-    }
+    user_avg = sessions.average_score
+    user_sessions = sessions.total_sessions
+    user_improvement = sessions.improvement_rate()
     
-    user_improvement = calculate_improvement_rate([p.score for p in all_progress])
+    # Population medians and the user's percentiles; None until the first benchmark run
+    score_benchmark, score_percentile = compare('average_score', user_avg)
+    sessions_benchmark, sessions_percentile = compare('session_count', user_sessions)
+    improvement_benchmark, improvement_percentile = compare('improvement_rate', user_improvement)
     
     return {
         'score_comparison': {
             'user_average': user_avg,
-            'benchmark': benchmarks['average_score_benchmark'],
-            'percentile': calculate_percentile(user_avg, benchmarks['average_score_benchmark'])
+            'benchmark': score_benchmark,
+            'percentile': score_percentile
         },
         'activity_comparison': {
             'user_sessions': user_sessions,
-            'benchmark': benchmarks['active_user_sessions'],
-            'activity_level': 'high' if user_sessions > benchmarks['active_user_sessions'] else 'moderate'
+            'benchmark': sessions_benchmark,
+            'percentile': sessions_percentile,
+            'activity_level': 'high' if sessions_percentile is not None and sessions_percentile > 50 else 'moderate'
         },
         'improvement_comparison': {
             'user_improvement': user_improvement,
-            'benchmark': benchmarks['improvement_rate_benchmark'],
-            'performance': 'above_average' if user_improvement > benchmarks['improvement_rate_benchmark'] else 'average'
+            'benchmark': improvement_benchmark,
+            'percentile': improvement_percentile,
+            'performance': 'above_average' if improvement_percentile is not None and improvement_percentile > 50 else 'average'
         }
     }
 
-def calculate_percentile(user_value, benchmark):
-    """Calculate approximate percentile based on benchmark"""
-    if user_value >= benchmark:
-        return min(95, 50 + (user_value - benchmark) / benchmark * 45)
-    else:
-        return max(5, 50 - (benchmark - user_value) / benchmark * 45)
-
 def calculate_current_trend(recent_progress):
     """Calculate current short-term trend"""
     if len(recent_progress) < 2:
         return 'stable'
     
     scores = [p.score for p in recent_progress]
-    improvement = calculate_improvement_rate(scores)
+    improvement = improvement_rate(scores)
     
     if improvement > 10:
         return 'improving'
@@ -2,9 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Exercise
 from db import db
+from idempotency import idempotent
 from marshmallow import Schema, fields, ValidationError
-from models import Progress
-from datetime import datetime
+from models import Progress, User
+from practice_streaks import local_date
 
 exercises_bp = Blueprint('exercises', __name__)
 
@@ -109,6 +110,7 @@ def start_exercise(exercise_id):
 
 @exercises_bp.route('/<int:exercise_id>/complete', methods=['POST'])
 @jwt_required()
+@idempotent
 def complete_exercise(exercise_id):
     user_id = get_jwt_identity()
     
@@ -127,7 +129,7 @@ def complete_exercise(exercise_id):
     progress = Progress(
         user_id=user_id,
         exercise_id=exercise_id,
-        date=datetime.now().date(),
+        date=local_date(User.query.get(user_id)),  # practice day in the user's timezone
         score=request_data.get('score', 100),  # Default score for completion
         session_duration=request_data.get('duration', 300),  # Default 5 minutes
         severity_level=exercise.severity,
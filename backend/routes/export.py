@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+
+from config import Config
+from db import db
+from models import Progress, AnalysisResult, AnalysisDetail
+
+export_bp = Blueprint('export', __name__)
+
+PROGRESS_COLUMNS = (
+    Progress.id, Progress.date, Progress.created_at, Progress.exercise_id, Progress.score,
+    Progress.session_duration, Progress.severity_level, Progress.fluency_rating,
+    Progress.confidence_rating, Progress.notes
+)
+ANALYSIS_COLUMNS = (
+    AnalysisResult.id, AnalysisResult.created_at, AnalysisResult.severity, AnalysisResult.score,
+    AnalysisResult.confidence, AnalysisResult.stutter_count, AnalysisResult.word_count,
+    AnalysisResult.audio_sha256
+)
+
+EXPORT_KINDS = ('progress', 'analyses', 'all')
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Encoded output is handed to the server in pieces of about this size
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _stream(statement):
+    """Rows of a select, fetched through a server-side cursor EXPORT_CHUNK_ROWS at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=Config.EXPORT_CHUNK_ROWS))
+    for partition in result.partitions():
+        for row in partition:
+            yield {key: _value(value) for key, value in row._mapping.items()}
+
+
+def progress_records(user_id):
+    return _stream(
+        select(*PROGRESS_COLUMNS).where(Progress.user_id == user_id)
+        .order_by(Progress.created_at, Progress.id)
+    )
+
+
+def analysis_records(user_id, details=False):
+    columns = ANALYSIS_COLUMNS + ((AnalysisDetail.analysis_data,) if details else ())
+    statement = select(*columns).where(AnalysisResult.user_id == user_id)\
+        .order_by(AnalysisResult.created_at, AnalysisResult.id)
+    if details:
+        statement = statement.outerjoin(AnalysisDetail, AnalysisDetail.analysis_id == AnalysisResult.id)
+    return _stream(statement)
+
+
+def _ndjson(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def _csv(records, fieldnames):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    # Yielded on its own so an export with no records is still a valid CSV
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for record in records:
+        if isinstance(record.get('analysis_data'), (dict, list)):
+            record['analysis_data'] = json.dumps(record['analysis_data'], separators=(',', ':'))
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _buffered(pieces):
+    """Join small text pieces into byte chunks of about EXPORT_BUFFER_BYTES"""
+    chunk, size = [], 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= EXPORT_BUFFER_BYTES:
+            yield ''.join(chunk).encode('utf-8')
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@export_bp.route('/<kind>', methods=['GET'])
+@jwt_required()
+def export_history(kind):
+    """
+    Stream a user's full history. ``kind`` is progress, analyses or all
+    (NDJSON only, each record tagged with its type). Query parameters:
+    format=ndjson|csv, details=1 to include the full analysis payload,
+    gzip=1 for a gzip-compressed download.
+    """
+    user_id = int(get_jwt_identity())
+    export_format = request.args.get('format', 'ndjson')
+    details = request.args.get('details') == '1'
+    compress = request.args.get('gzip') == '1'
+
+    if kind not in EXPORT_KINDS:
+        return jsonify({'error': f"Unknown export; use one of {', '.join(EXPORT_KINDS)}"}), 404
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if kind == 'all' and export_format != 'ndjson':
+        return jsonify({'error': 'Combined exports are only available as NDJSON'}), 400
+
+    if kind == 'progress':
+        records = progress_records(user_id)
+        fieldnames = [column.key for column in PROGRESS_COLUMNS]
+    elif kind == 'analyses':
+        records = analysis_records(user_id, details)
+        fieldnames = [column.key for column in ANALYSIS_COLUMNS] + (['analysis_data'] if details else [])
+    else:
+        def tagged():
+            for record in progress_records(user_id):
+                yield {'type': 'progress', **record}
+            for record in analysis_records(user_id, details):
+                yield {'type': 'analysis', **record}
+        records = tagged()
+
+    pieces = _ndjson(records) if export_format == 'ndjson' else _csv(records, fieldnames)
+    body = _buffered(pieces)
+    filename = f"{kind}-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    mimetype = EXPORT_FORMATS[export_format]
+    if compress:
+        body = _gzipped(body)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
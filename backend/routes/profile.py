@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, AnalysisResult
+from models import User
 from db import db
+from analysis_stats import get_user_stats, average_score
 from marshmallow import Schema, fields, ValidationError
 from werkzeug.security import check_password_hash, generate_password_hash
 
@@ -36,7 +37,8 @@ def get_profile():
         return jsonify({'error': 'User not found'}), 404
     
     # Get user statistics
-    analysis_count = AnalysisResult.query.filter_by(user_id=user_id).count()
+    stats = get_user_stats(user_id)
+    analysis_count = stats.total_analyses if stats else 0
     
     return jsonify({
         'name': user.name, 
@@ -125,21 +127,14 @@ def update_password():
 def get_user_statistics():
     user_id = get_jwt_identity()
     
-    # Get comprehensive user statistics
-    total_analyses = AnalysisResult.query.filter_by(user_id=user_id).count()
-    recent_analyses = AnalysisResult.query.filter_by(user_id=user_id).order_by(AnalysisResult.created_at.desc()).limit(5).all()
-    
-    avg_score = db.session.query(db.func.avg(AnalysisResult.score)).filter_by(user_id=user_id).scalar()
+    # Single-row lookup of the summary kept by analysis_stats.py
+    stats = get_user_stats(user_id)
+    avg_score = average_score(stats)
     
     return jsonify({
-        'total_analyses': total_analyses,
+        'total_analyses': stats.total_analyses if stats else 0,
         'average_score': round(avg_score, 2) if avg_score else 0,
-        'recent_analyses': [{
-            'id': r.id,
-            'severity': r.severity,
-            'score': r.score,
-            'created_at': r.created_at.isoformat()
-        } for r in recent_analyses]
+        'recent_analyses': (stats.recent_analyses or []) if stats else []
     }) 
 
 @profile_bp.route('/preferences', methods=['PUT'])
@@ -2,7 +2,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User
 from db import db
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, validate, ValidationError
+from audio_archival import RETENTION_TIERS
+from zoneinfo import available_timezones
 
 class SettingsUpdateSchema(Schema):
     notifications = fields.Bool(required=False)
@@ -10,6 +12,8 @@ class SettingsUpdateSchema(Schema):
     emailUpdates = fields.Bool(required=False)
     accessibility = fields.Bool(required=False)
     darkMode = fields.Bool(required=False)
+    recordingRetention = fields.Str(required=False, validate=validate.OneOf(list(RETENTION_TIERS)))
+    timezone = fields.Str(required=False, validate=validate.OneOf(sorted(available_timezones()), error='Unknown timezone'))  # IANA name, for practice days
 
 settings_bp = Blueprint('settings', __name__)
 
@@ -33,10 +37,8 @@ def update_settings():
         data = SettingsUpdateSchema().load(request.json)
     except ValidationError as err:
         return jsonify({'error': err.messages}), 400
-    # Merge new settings into existing preferences
-    prefs = user.preferences or {}
-    prefs.update(data)
-    user.preferences = prefs
+    # Merge new settings into a new dict: the JSON column only sees a change when the value is reassigned
+    user.preferences = {**(user.preferences or {}), **data}
     try:
         db.session.commit()
         return jsonify({'message': 'Settings updated', 'settings': user.preferences}), 200
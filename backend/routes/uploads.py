@@ -0,0 +1,345 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import UploadSession, AnalysisResult
+from db import db
+from routes.analysis import allowed_file, analyze_and_store, analysis_response
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+uploads_bp = Blueprint('uploads', __name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Running SHA-256 per open upload, keyed by upload id: (offset hashed so far, hash object).
+# Rebuilt from the partial file if lost (e.g. after a restart).
+_running_hashes = {}
+_hash_lock = threading.Lock()
+
+
+def _part_path(upload_id):
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'sessions')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f'{upload_id}.part')
+
+
+@contextmanager
+def _locked_part(upload_id):
+    """
+    Open an upload's part file under an exclusive lock, yielding None when
+    another request (in any worker process) holds it. Appends and finalize
+    both take it, so only one of them touches an upload at a time.
+    """
+    import fcntl
+
+    f = open(_part_path(upload_id), 'r+b')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        yield None
+        return
+    try:
+        yield f
+    finally:
+        # Closing the file releases the lock
+        f.close()
+
+
+def _running_hash(upload):
+    """Return the hash object covering the first received_size bytes of an upload"""
+    with _hash_lock:
+        state = _running_hashes.get(upload.id)
+    if state and state[0] == upload.received_size:
+        return state[1]
+
+    running = hashlib.sha256()
+    remaining = upload.received_size
+    with open(_part_path(upload.id), 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            running.update(chunk)
+            remaining -= len(chunk)
+    return running
+
+
+def _upload_status(upload):
+    return {
+        'upload_id': upload.id,
+        'offset': upload.received_size,
+        'total_size': upload.total_size,
+        'status': upload.status,
+        'analysis_id': upload.analysis_id,
+        'expires_at': upload.expires_at.isoformat() if upload.expires_at else None
+    }
+
+
+def _expiry():
+    """Unfinished uploads are kept this long after they were last written to"""
+    return datetime.utcnow() + timedelta(seconds=current_app.config['CHUNKED_UPLOAD_EXPIRE_SECONDS'])
+
+
+def _get_upload(upload_id, user_id):
+    return UploadSession.query.filter_by(id=upload_id, user_id=user_id).first()
+
+
+def _reload(upload):
+    """Re-read an upload under its lock; None if the expiry sweep removed it meanwhile"""
+    return UploadSession.query.populate_existing().filter_by(id=upload.id).first()
+
+
+def _not_open(upload):
+    if upload.status == 'finalizing':
+        return jsonify({'error': 'Upload is being finalized', **_upload_status(upload)}), 409
+    return jsonify({'error': 'Upload already finalized', **_upload_status(upload)}), 409
+
+
+def expire_uploads(now=None):
+    """
+    Delete unfinished uploads past their expiry, with their partial files.
+    Uploads a request holds the lock on are left for the next pass.
+    Returns (uploads removed, bytes freed).
+    """
+    now = now or datetime.utcnow()
+    expired = UploadSession.query.filter(
+        UploadSession.status != 'finalized',
+        UploadSession.expires_at < now
+    ).all()
+
+    removed = freed = 0
+    for upload in expired:
+        try:
+            with _locked_part(upload.id) as f:
+                if f is None:
+                    continue  # a chunk is being written; it extends the expiry
+                db.session.refresh(upload)
+                if upload.status == 'finalized' or upload.expires_at >= now:
+                    continue
+                freed += os.fstat(f.fileno()).st_size
+                os.unlink(_part_path(upload.id))
+                db.session.delete(upload)
+                db.session.commit()
+        except FileNotFoundError:
+            # No partial file left; only the row remains
+            db.session.delete(upload)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Could not expire upload {upload.id}: {e}")
+            continue
+        with _hash_lock:
+            _running_hashes.pop(upload.id, None)
+        removed += 1
+
+    if removed:
+        logger.info(f"Expired {removed} abandoned uploads, {freed} bytes freed")
+    return removed, freed
+
+
+@uploads_bp.route('/', methods=['POST'])
+@jwt_required()
+def init_upload():
+    """Start a resumable upload for a long recording"""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    filename = data.get('filename', '')
+    total_size = data.get('total_size')
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg, webm'}), 400
+    if not isinstance(total_size, int) or total_size <= 0:
+        return jsonify({'error': 'total_size must be a positive integer'}), 400
+    if total_size > current_app.config['CHUNKED_UPLOAD_MAX_SIZE']:
+        return jsonify({'error': 'Recording is too large'}), 413
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=filename,
+        total_size=total_size,
+        received_size=0,
+        expected_sha256=(data.get('sha256') or '').lower() or None,
+        status='open',
+        expires_at=_expiry()
+    )
+
+    try:
+        open(_part_path(upload.id), 'wb').close()
+        db.session.add(upload)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error starting upload: {e}")
+        return jsonify({'error': 'Failed to start upload'}), 500
+
+    with _hash_lock:
+        _running_hashes[upload.id] = (0, hashlib.sha256())
+
+    return jsonify({
+        **_upload_status(upload),
+        'chunk_size': current_app.config['CHUNKED_UPLOAD_CHUNK_SIZE']
+    }), 201
+
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload_status(upload_id):
+    """Report how many bytes have landed so a client can resume from there"""
+    upload = _get_upload(upload_id, get_jwt_identity())
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(_upload_status(upload))
+
+
+@uploads_bp.route('/<upload_id>', methods=['PUT'])
+@jwt_required()
+def append_chunk(upload_id):
+    """
+    Append a raw chunk at the offset given in the Upload-Offset header.
+    A chunk at the wrong offset is rejected with the server's current offset.
+    """
+    upload = _get_upload(upload_id, get_jwt_identity())
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload.status != 'open':
+        return _not_open(upload)
+
+    offset = request.headers.get('Upload-Offset', request.args.get('offset'), type=int)
+    if offset is None:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+
+    try:
+        with _locked_part(upload.id) as f:
+            if f is None:
+                return jsonify({'error': 'Another request is writing to this upload', **_upload_status(upload)}), 409
+
+            # Re-read under the lock: a concurrent chunk, finalize or expiry may have landed since
+            upload = _reload(upload)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            if upload.status != 'open':
+                return _not_open(upload)
+            if offset != upload.received_size:
+                return jsonify({'error': 'Offset mismatch', **_upload_status(upload)}), 409
+
+            running = _running_hash(upload).copy()
+            written = 0
+            # Overwrite anything left by a chunk whose commit never landed
+            f.seek(offset)
+            while True:
+                chunk = request.stream.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if offset + written + len(chunk) > upload.total_size:
+                    return jsonify({'error': 'Chunk exceeds declared total_size', **_upload_status(upload)}), 400
+                f.write(chunk)
+                running.update(chunk)
+                written += len(chunk)
+            f.truncate()
+            f.flush()
+
+            upload.received_size = offset + written
+            upload.expires_at = _expiry()
+            db.session.commit()
+
+            with _hash_lock:
+                _running_hashes[upload.id] = (upload.received_size, running)
+    except FileNotFoundError:
+        # Finalize or the expiry sweep removed the part file between our status check and opening it
+        db.session.rollback()
+        upload = _reload(upload)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        return _not_open(upload)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error appending chunk to upload {upload_id}: {e}")
+        return jsonify({'error': 'Failed to store chunk'}), 500
+
+    return jsonify(_upload_status(upload))
+
+
+@uploads_bp.route('/<upload_id>/finalize', methods=['POST'])
+@jwt_required()
+def finalize_upload(upload_id):
+    """Verify the assembled recording and analyze it"""
+    user_id = get_jwt_identity()
+    upload = _get_upload(upload_id, user_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    # Finalize is safe to retry: return the analysis produced the first time
+    if upload.status == 'finalized':
+        analysis = AnalysisResult.query.options(db.joinedload(AnalysisResult.detail))\
+            .filter_by(id=upload.analysis_id, user_id=user_id).first()
+        if analysis:
+            return jsonify(analysis_response(analysis, analysis.analysis_data))
+
+    try:
+        with _locked_part(upload.id) as f:
+            if f is None:
+                return jsonify({'error': 'Another request is writing to this upload', **_upload_status(upload)}), 409
+
+            upload = _reload(upload)
+            if not upload:
+                return jsonify({'error': 'Upload not found'}), 404
+            if upload.status != 'open':
+                # A concurrent finalize won; the client can retry to fetch its analysis
+                return _not_open(upload)
+            if upload.received_size != upload.total_size:
+                return jsonify({'error': 'Upload is incomplete', **_upload_status(upload)}), 409
+
+            digest = _running_hash(upload).hexdigest()
+            if upload.expected_sha256 and digest != upload.expected_sha256:
+                return jsonify({'error': 'Checksum mismatch', 'sha256': digest}), 422
+
+            # Claimed under the lock, then analyzed without it: chunks and other
+            # finalizes see 'finalizing' instead of waiting out the analysis
+            upload.status = 'finalizing'
+            upload.expires_at = _expiry()
+            db.session.commit()
+    except FileNotFoundError:
+        db.session.rollback()
+        upload = _reload(upload)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        return _not_open(upload)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error finalizing upload {upload_id}: {e}")
+        return jsonify({'error': 'Failed to process audio file'}), 500
+
+    part_path = _part_path(upload.id)
+    try:
+        analysis_record, analysis_result = analyze_and_store(user_id, part_path, digest=digest)
+        upload.status = 'finalized'
+        upload.analysis_id = analysis_record.id
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error finalizing upload {upload_id}: {e}")
+        # Reopen it, so the client can retry the finalize
+        upload = _reload(upload)
+        if upload:
+            upload.status = 'open'
+            db.session.commit()
+        return jsonify({'error': 'Failed to process audio file'}), 500
+
+    with _hash_lock:
+        _running_hashes.pop(upload.id, None)
+    try:
+        os.unlink(part_path)
+    except Exception as e:
+        logger.warning(f"Could not delete upload file {part_path}: {e}")
+
+    response = analysis_response(analysis_record, analysis_result)
+    response['sha256'] = digest
+    return jsonify(response)
@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db import db
 from models import User
+from response_cache import results_cache
 
 user_bp = Blueprint('user', __name__)
 
@@ -44,4 +45,5 @@ def delete_account():
         return jsonify({'error': 'User not found'}), 404
     db.session.delete(user)
     db.session.commit()
+    results_cache.invalidate_user(user_id)
     return jsonify({'message': 'Account deleted successfully'}), 200
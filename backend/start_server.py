@@ -80,6 +80,21 @@ def main():
         print("📱 API endpoints will be at: http://localhost:5000/api/")
         print("\nPress Ctrl+C to stop the server")
         
+        # With debug=True the reloader runs the app in a child process; start the
+        # background workers only there, so a single copy of each is running
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            # Archive old recordings in the background
+            from audio_archival import start_archival_worker
+            start_archival_worker(app)
+
+            # Rebuild population benchmark sketches in the background
+            from population_benchmarks import start_benchmark_worker
+            start_benchmark_worker(app)
+
+            # Remove abandoned resumable uploads in the background
+            from upload_expiry import start_upload_sweeper
+            start_upload_sweeper(app)
+
         # Start the server
         app.run(host='0.0.0.0', port=5000, debug=True)
         
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Regression test: analysis history pages must not repeat or skip rows that
+share one second, whether stamped by the ORM or by a legacy CURRENT_TIMESTAMP
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Point the app at a scratch database before config is imported
+TMP_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'history.db')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import app
+from db import db
+from models import User, AnalysisResult
+from migrate_add_history_index_to_analysis_result import normalize_created_at
+
+
+def test_history_pages_share_one_second():
+    with app.app_context():
+        db.create_all()
+        user = User(name='History', email='history@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        # Four rows as CURRENT_TIMESTAMP used to store them, then three stamped by the ORM, all in one second
+        with db.engine.begin() as conn:
+            for _ in range(4):
+                conn.execute(text(
+                    "INSERT INTO analysis_result (user_id, severity, score, created_at) "
+                    "VALUES (:user_id, 'mild', 70, '2025-01-01 12:00:00')"
+                ), {'user_id': user.id})
+            normalize_created_at(conn)
+        for _ in range(3):
+            db.session.add(AnalysisResult(user_id=user.id, severity='mild', score=70,
+                                          created_at=datetime(2025, 1, 1, 12, 0, 0)))
+        db.session.commit()
+
+        expected = [analysis_id for (analysis_id,) in db.session.query(AnalysisResult.id)
+                    .order_by(AnalysisResult.id.desc())]
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    client = app.test_client()
+    seen, cursor = [], None
+    # A broken cursor can cycle forever; more pages than rows is already a failure
+    for _ in range(len(expected) + 1):
+        url = '/api/analysis/history?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).get_json()
+        seen.extend(result['id'] for result in page['results'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == expected, f'pages returned {seen}, expected {expected}'
+
+
+if __name__ == '__main__':
+    print("🔍 Paging analysis history across rows from the same second...")
+    test_history_pages_share_one_second()
+    print("✅ Every row appears exactly once, newest first")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Regression tests: uploading an archived recording again restores the
+original, and an archival step never removes a raw copy that was uploaded
+again after the pass picked its candidates
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from audio_store import LocalAudioStore
+
+
+def _upload(folder, data):
+    fd, path = tempfile.mkstemp(dir=folder, suffix='.wav')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def _archive(folder, store, digest):
+    archive_path = _upload(folder, b'lossy')
+    return store.put_archive(digest, archive_path, 'opus')
+
+
+def test_upload_restores_archived_original():
+    folder = tempfile.mkdtemp()
+    store = LocalAudioStore(os.path.join(folder, 'store'))
+    digest = store.put_file(_upload(folder, b'original'))
+    assert _archive(folder, store, digest)
+    assert store.storage_format(digest) == 'opus'
+
+    assert store.put_file(_upload(folder, b'original')) == digest
+    assert store.storage_format(digest) == 'raw'
+    with open(store.local_path(digest), 'rb') as f:
+        assert f.read() == b'original'
+    assert not os.path.exists(store.local_path(digest) + '.opus')
+
+
+def test_archival_keeps_recording_uploaded_during_pass():
+    folder = tempfile.mkdtemp()
+    store = LocalAudioStore(os.path.join(folder, 'store'))
+    digest = store.put_file(_upload(folder, b'original'))
+    old = datetime.utcnow() - timedelta(days=60)
+    os.utime(store.local_path(digest), (old.timestamp(), old.timestamp()))
+
+    # The pass picks it up as unused for 30 days, then the same bytes are uploaded again
+    cutoff = datetime.utcnow() - timedelta(days=30)
+    store.put_file(_upload(folder, b'original'))
+
+    archive_path = _upload(folder, b'lossy')
+    assert not store.put_archive(digest, archive_path, 'opus', unused_since=cutoff)
+    assert not os.path.exists(archive_path)
+    assert not store.delete(digest, unused_since=cutoff)
+    assert store.storage_format(digest) == 'raw'
+
+    # Once it has gone unused past the cutoff, archival proceeds
+    os.utime(store.local_path(digest), (old.timestamp(), old.timestamp()))
+    assert store.put_archive(digest, _upload(folder, b'lossy'), 'opus', unused_since=cutoff)
+    assert store.storage_format(digest) == 'opus'
+
+
+if __name__ == '__main__':
+    print("🔍 Re-uploading an archived recording...")
+    test_upload_restores_archived_original()
+    print("✅ The original was restored")
+    print("🔍 Re-uploading a recording during an archival pass...")
+    test_archival_keeps_recording_uploaded_during_pass()
+    print("✅ The raw copy was kept")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Regression test: when one inference segment fails, the other segments have
+finished writing to the shared waveform buffer before the error reaches the
+caller (who then releases the buffer back to the pool)
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import torch
+
+from ml.model import StutteringAnalyzer, SAMPLE_RATE
+
+
+def test_failed_segment_waits_for_the_others():
+    analyzer = StutteringAnalyzer.__new__(StutteringAnalyzer)
+    analyzer.segment_executor = ThreadPoolExecutor(max_workers=4)
+    finished = []
+    lock = threading.Lock()
+
+    def predict(segment):
+        if segment[0].item() == 0:
+            raise RuntimeError('segment failed')
+        time.sleep(0.2)
+        segment.zero_()  # stands in for in-place normalization
+        with lock:
+            finished.append(segment.shape[0])
+        return 0, 0.5
+
+    analyzer._predict_with_model = predict
+    # Four 20s segments; only the first one starts with a zero sample
+    waveform = torch.ones(80 * SAMPLE_RATE)
+    waveform[0] = 0
+
+    try:
+        analyzer._predict_segmented(waveform)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('the failing segment did not raise')
+    finally:
+        analyzer.segment_executor.shutdown(wait=False)
+
+    assert len(finished) == 3, f'{len(finished)} of 3 segments had finished when the error was raised'
+
+
+if __name__ == '__main__':
+    print("🔍 Failing one of four inference segments...")
+    test_failed_segment_waits_for_the_others()
+    print("✅ The other segments finished before the error was raised")
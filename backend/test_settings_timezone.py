@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Regression test: a user's timezone can be changed again after it is first
+set, and practice days follow the latest setting
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Point the app at a scratch database before config is imported
+TMP_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'settings.db')
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from db import db
+from models import User
+from practice_streaks import local_date
+
+
+def test_timezone_can_be_changed():
+    with app.app_context():
+        db.create_all()
+        user = User(name='Timezone', email='timezone@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    client = app.test_client()
+    for timezone in ('America/Los_Angeles', 'Asia/Tokyo'):
+        response = client.put('/api/settings/', json={'timezone': timezone}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        saved = client.get('/api/settings/', headers=headers).get_json()
+        assert saved.get('timezone') == timezone, f'saved {saved}, expected {timezone}'
+
+    # 20:00 UTC is already the next day in Tokyo, but not in Los Angeles
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert str(local_date(user, datetime(2025, 3, 1, 20, 0))) == '2025-03-02'
+
+
+if __name__ == '__main__':
+    print("🔍 Changing a user's timezone twice...")
+    test_timezone_can_be_changed()
+    print("✅ The second timezone was saved and sets the practice day")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Remove abandoned resumable uploads
+
+An upload that is not finalized within CHUNKED_UPLOAD_EXPIRE_SECONDS of its
+last chunk is abandoned: its UploadSession row and partial file (up to
+CHUNKED_UPLOAD_MAX_SIZE) are deleted. Uploads a request is writing to right
+now are left for the next pass.
+
+Usage: python upload_expiry.py
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def start_upload_sweeper(app, interval_seconds=None):
+    """Expire abandoned uploads periodically on a daemon thread"""
+    interval_seconds = interval_seconds or Config.UPLOAD_SWEEP_INTERVAL_SECONDS
+    if interval_seconds <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                with app.app_context():
+                    from routes.uploads import expire_uploads
+                    expire_uploads()
+            except Exception as e:
+                logger.error(f"Upload expiry pass failed: {e}")
+
+    worker = threading.Thread(target=run, name='upload-expiry', daemon=True)
+    worker.start()
+    return worker
+
+
+def main():
+    from app import app
+    from routes.uploads import expire_uploads
+
+    print(f"🔍 Removing uploads idle for more than {Config.CHUNKED_UPLOAD_EXPIRE_SECONDS} seconds...")
+    with app.app_context():
+        removed, freed = expire_uploads()
+    print(f"🗑️  Removed: {removed}")
+    print(f"💾 Freed: {freed / (1024 * 1024):.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
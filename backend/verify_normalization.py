@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check that the native Wav2Vec2Normalizer matches the HuggingFace
+Wav2Vec2FeatureExtractor output, and compare their speed
+
+Usage: python verify_normalization.py [model_dir]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from transformers import Wav2Vec2FeatureExtractor
+from ml.normalization import Wav2Vec2Normalizer
+
+TOLERANCE = 1e-5
+SAMPLE_RATE = 16000
+
+
+def load(model_dir):
+    if os.path.exists(os.path.join(model_dir, 'preprocessor_config.json')):
+        print(f"📁 Using preprocessor config from {model_dir}")
+        return (Wav2Vec2FeatureExtractor.from_pretrained(model_dir),
+                Wav2Vec2Normalizer.from_pretrained(model_dir))
+    print("⚠️  No preprocessor_config.json found, using default Wav2Vec2 settings")
+    return Wav2Vec2FeatureExtractor(), Wav2Vec2Normalizer()
+
+
+def compare(name, expected, actual):
+    max_diff = float(np.abs(expected - actual).max())
+    passed = max_diff <= TOLERANCE
+    print(f"{'✅' if passed else '❌'} {name}: max abs difference {max_diff:.2e}")
+    return passed
+
+
+def main():
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'ml', 'stuttering_model')
+    extractor, normalizer = load(model_dir)
+    rng = np.random.default_rng(0)
+    all_passed = True
+
+    # Single recording, as used by _predict_with_model
+    waveform = rng.normal(0.1, 0.3, SAMPLE_RATE * 10).astype(np.float32)
+    expected = extractor(waveform, sampling_rate=SAMPLE_RATE, return_tensors='np').input_values
+    actual = normalizer.normalize_(torch.from_numpy(waveform.copy()).unsqueeze(0)).numpy()
+    all_passed &= compare('single recording', expected, actual)
+
+    # Padded batch of different lengths
+    waveforms = [rng.normal(0, 0.2, SAMPLE_RATE * seconds).astype(np.float32) for seconds in (3, 7, 12, 5)]
+    expected = extractor(waveforms, sampling_rate=SAMPLE_RATE, padding=True,
+                         return_attention_mask=True, return_tensors='np').input_values
+    batch, lengths = normalizer.pad([torch.from_numpy(w) for w in waveforms])
+    actual = normalizer.normalize_(batch, lengths).numpy()
+    all_passed &= compare('padded batch', expected, actual)
+
+    # Timing
+    repeats = 20
+    start = time.perf_counter()
+    for _ in range(repeats):
+        extractor(waveforms, sampling_rate=SAMPLE_RATE, padding=True, return_attention_mask=True, return_tensors='pt')
+    extractor_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    tensors = [torch.from_numpy(w) for w in waveforms]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        batch, lengths = normalizer.pad(tensors)
+        normalizer.normalize_(batch, lengths)
+    native_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    print(f"\n⏱️  Feature extractor: {extractor_ms:.2f} ms/batch")
+    print(f"⏱️  Native normalizer: {native_ms:.2f} ms/batch ({extractor_ms / native_ms:.1f}x)")
+    print(f"\n{'🎉 Outputs match!' if all_passed else '❌ Outputs differ!'}")
+    sys.exit(0 if all_passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -81,14 +81,13 @@ def send_real_time_stats(user_id):
             .filter(Progress.created_at >= datetime.now() - timedelta(days=30))\
             .order_by(Progress.created_at.desc()).limit(10).all()
         
-        # Get recent analysis results
-        recent_analyses = AnalysisResult.query.filter_by(user_id=user_id)\
-            .filter(AnalysisResult.created_at >= datetime.now() - timedelta(days=7))\
-            .order_by(AnalysisResult.created_at.desc()).all()
+        # Count recent analysis results
+        weekly_analyses = AnalysisResult.query.filter_by(user_id=user_id)\
+            .filter(AnalysisResult.created_at >= datetime.now() - timedelta(days=7)).count()
         
         stats = {
             'recent_sessions': len(recent_progress),
-            'weekly_analyses': len(recent_analyses),
+            'weekly_analyses': weekly_analyses,
             'average_score': sum(p.score for p in recent_progress) / len(recent_progress) if recent_progress else 0,
             'improvement_trend': calculate_improvement_trend(recent_progress),
             'last_session': recent_progress[0].created_at.isoformat() if recent_progress else None
@@ -173,7 +173,8 @@ const AudioRecorder: React.FC<AudioRecorderProps> = ({
       };
       
       mediaRecorder.onstop = () => {
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
+        // MediaRecorder produces WebM/Opus (or MP4 on Safari), not WAV
+        const audioBlob = new Blob(audioChunksRef.current, { type: mediaRecorder.mimeType || 'audio/webm' });
         if (onRecordingComplete) {
           onRecordingComplete(audioBlob);
         }
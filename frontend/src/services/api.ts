@@ -72,6 +72,23 @@ export interface CreatePostData {
   content: string;
 }
 
+export interface DetailedReport {
+  [section: string]: any;
+  snapshot: {
+    version: number;
+    generated_at: string;
+    refreshing: boolean;
+    next_version: number | null;
+  };
+}
+
+// Returned (HTTP 202) until the first report has been generated
+export interface DetailedReportPending {
+  status: 'pending' | 'running';
+  version: number | null;
+  message: string;
+}
+
 // API Error handling
 export class APIError extends Error {
   constructor(
@@ -190,11 +207,19 @@ export const authAPI = {
   },
 };
 
+const audioExtension = (mimeType: string): string => {
+  if (mimeType.includes('webm')) return 'webm';
+  if (mimeType.includes('ogg')) return 'ogg';
+  if (mimeType.includes('mp4') || mimeType.includes('m4a')) return 'm4a';
+  if (mimeType.includes('mpeg')) return 'mp3';
+  return 'wav';
+};
+
 // Analysis API
 export const analysisAPI = {
   uploadAudio: async (audioBlob: Blob): Promise<{ message: string; analysis_id: number }> => {
     const formData = new FormData();
-    formData.append('audio', audioBlob, 'recording.wav');
+    formData.append('audio', audioBlob, `recording.${audioExtension(audioBlob.type)}`);
 
     const url = `${API_BASE_URL}/analysis/upload`;
     const token = localStorage.getItem('authToken');
@@ -223,8 +248,23 @@ export const analysisAPI = {
     return await apiCall<AnalysisResult>(`/analysis/results/${analysisId}`);
   },
 
-  getHistory: async (): Promise<{ results: any[] }> => {
-    return await apiCall<{ results: any[] }>('/analysis/history');
+  getHistory: async (filters?: {
+    cursor?: string;
+    limit?: number;
+    severity?: string;
+    from?: string;
+    to?: string;
+  }): Promise<{ results: any[]; next_cursor: string | null; has_more: boolean }> => {
+    const params = new URLSearchParams();
+    if (filters?.cursor) params.append('cursor', filters.cursor);
+    if (filters?.limit) params.append('limit', String(filters.limit));
+    if (filters?.severity) params.append('severity', filters.severity);
+    if (filters?.from) params.append('from', filters.from);
+    if (filters?.to) params.append('to', filters.to);
+
+    const queryString = params.toString();
+    const endpoint = queryString ? `/analysis/history?${queryString}` : '/analysis/history';
+    return await apiCall<{ results: any[]; next_cursor: string | null; has_more: boolean }>(endpoint);
   },
 };
 
@@ -385,8 +425,20 @@ export const analyticsAPI = {
   getDashboard: async (): Promise<any> => {
     return await apiCall<any>('/analytics/dashboard');
   },
+
+  // Check the result with isReportPending; a pending report is announced by a report_ready event
+  getDetailedReport: async (refresh = false): Promise<DetailedReport | DetailedReportPending> => {
+    const endpoint = refresh ? '/analytics/detailed-report?refresh=1' : '/analytics/detailed-report';
+    return await apiCall<DetailedReport | DetailedReportPending>(endpoint);
+  },
 };
 
+export function isReportPending(
+  report: DetailedReport | DetailedReportPending
+): report is DetailedReportPending {
+  return !('snapshot' in report);
+}
+
 // Export all APIs
 export const api = {
   auth: authAPI,